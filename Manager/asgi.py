@@ -3,13 +3,16 @@ ASGI config for Manager project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Views run in a bounded thread pool of ASGI_THREADS threads while request and
+response I/O stays on the event loop; see ManagerApp.asgi.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+from ManagerApp.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Manager.settings')
 
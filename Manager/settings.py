@@ -51,19 +51,90 @@ INSTALLED_APPS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
-        
+        'ManagerApp.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
-        'ManagerApp.permisions.AllowOwnerOnly', )
+        'ManagerApp.permisions.AllowOwnerOnly', ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'ManagerApp.throttling.UserTokenBucket', ),
+    'DEFAULT_PAGINATION_CLASS': 'ManagerApp.pagination.DateCreatedCursorPagination',
+    'PAGE_SIZE': 100,
+    # orjson-backed JSON when orjson is installed (optional), DRF's json otherwise.
+    'DEFAULT_RENDERER_CLASSES': (
+        'ManagerApp.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'ManagerApp.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Seconds a token stays valid after it is issued; clients refresh it through
+# the token/refresh/ endpoint.
+TOKEN_TTL = 60 * 60 * 24 * 7
+
+# Seconds a create response stays replayable under its Idempotency-Key;
+# purge_idempotency_keys deletes older keys.
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+# Seconds an authenticated token (and its user) stays cached by
+# ManagerApp.authentication.CachedTokenAuthentication.
+TOKEN_AUTH_CACHE_TIMEOUT = 300
+TOKEN_AUTH_CACHE_ALIAS = 'default'
+
+# Seconds a list response stays in the per-user list cache (0 disables it).
+LIST_CACHE_TIMEOUT = 60
+LIST_CACHE_ALIAS = 'default'
+
+# Requests kept per URL name for the percentiles served at request-metrics/.
+# Per-request JSON lines go to the ManagerApp.requests logger at INFO level.
+REQUEST_METRICS_WINDOW = 1000
+
+# Seconds a time budget's merged busy intervals stay cached for the free/busy
+# endpoints; slot writes invalidate them sooner.
+BUSY_CACHE_TIMEOUT = 300
+BUSY_CACHE_ALIAS = 'default'
+
+# Token bucket throttling (ManagerApp.throttling) for views that do not set
+# their own throttle_rate/throttle_burst: each client may burst THROTTLE_BURST
+# requests per view, refilled at THROTTLE_RATE. Buckets live in the
+# THROTTLE_CACHE_ALIAS cache, which must be shared by all workers (e.g.
+# Redis or Memcached) for the limits to hold across processes.
+THROTTLE_ENABLED = True
+THROTTLE_RATE = '10/s'
+THROTTLE_BURST = 60
+THROTTLE_CACHE_ALIAS = 'default'
+
+# Response compression: gzip always, br when the brotli package is installed.
+# Bodies under COMPRESSION_MIN_SIZE bytes are not worth the CPU and go out as
+# they are; streaming exports are flushed every COMPRESSION_STREAMING_FLUSH_SIZE
+# bytes of input.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_CONTENT_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_STREAMING_FLUSH_SIZE = 16 * 1024
+
 MIDDLEWARE = [
+    'ManagerApp.instrumentation.RequestMetricsMiddleware',
+    'ManagerApp.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'ManagerApp.throttling.ThrottleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,16 +159,85 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'Manager.wsgi.application'
 
+# Threads running views under Manager.asgi.application; this bounds how many
+# requests use the database at once.
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 16))
+
 
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# DB_ENGINE selects the profile: 'sqlite' (default, single node) or
+# 'postgresql' (production; needs psycopg2). Connections are kept open for
+# DB_CONN_MAX_AGE seconds; Django's close_old_connections drops them when they
+# expire or after a request that hit a database error, so requests run no
+# health-check query of their own.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'manager'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+            # Seconds a writer waits on the database lock before failing (busy_timeout).
+            'OPTIONS': {
+                'timeout': int(os.environ.get('DB_BUSY_TIMEOUT', 20)),
+            },
+            # WAL lets readers proceed while a write is in progress; see ManagerApp.db.
+            'JOURNAL_MODE': os.environ.get('DB_JOURNAL_MODE', 'WAL'),
+        }
     }
+
+# A file name here makes the test database (and `manage.py benchmark`) use a
+# real file, e.g. to measure SQLite WAL behaviour; in-memory by default.
+if os.environ.get('DB_TEST_NAME'):
+    DATABASES['default']['TEST'] = {'NAME': os.environ['DB_TEST_NAME']}
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/3.0/topics/auth/passwords/
+
+# PASSWORD_HASHER_PROFILE picks the hasher for new passwords: 'scrypt'
+# (default, standard library), 'argon2' (needs argon2-cffi) or 'pbkdf2'.
+# Hashes made by the others still verify and are upgraded on sign in.
+PASSWORD_HASHER_PROFILES = {
+    'scrypt': 'ManagerApp.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
 }
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'scrypt')
+
+PASSWORD_HASHERS = [PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]] + [
+    hasher for hasher in (
+        'ManagerApp.hashers.ScryptPasswordHasher',
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    ) if hasher != PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]
+]
+
+# Processes signup and sign in hash passwords in, so hashing uses every core
+# without holding the GIL of the request threads (0 hashes in the request thread).
+PASSWORD_HASHING_PROCESSES = int(os.environ.get('PASSWORD_HASHING_PROCESSES', os.cpu_count() or 1))
+
+AUTHENTICATION_BACKENDS = ['ManagerApp.authentication.PooledPasswordBackend']
 
 
 # Password validation
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ManagerappConfig(AppConfig):
     name = 'ManagerApp'
+
+    def ready(self):
+        from . import signals  # noqa: F401
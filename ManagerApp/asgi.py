@@ -0,0 +1,144 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.core import signals
+from django.core.exceptions import RequestAborted
+from django.core.handlers.asgi import ASGIHandler
+from django.http import FileResponse
+from django.urls import set_script_prefix
+
+
+class BoundedASGIHandler(ASGIHandler):
+    """
+    ASGI handler that reads requests and writes responses on the event loop
+    and runs the synchronous Django/DRF views in a dedicated pool of
+    ASGI_THREADS threads.
+
+    A slow client therefore only holds a coroutine while its body or response
+    is in flight, never a thread, and the number of requests touching the
+    database at once is capped by the pool instead of the loop's unbounded
+    default executor.
+
+    Each request is handled start to finish by one job in the pool: the view,
+    draining a streaming response (ledger exports run queries while they
+    iterate) and close(), whose request_finished handlers clean up that
+    thread's database connection. Streamed parts reach the loop through a
+    bounded queue, so a slow client reading a large export does hold its
+    thread until the export is sent.
+    """
+    # Parts of a streaming response joined into one body message.
+    streaming_batch_size = 256
+    # Body messages buffered between the pool thread and the event loop.
+    streaming_queue_size = 4
+
+    def __init__(self):
+        super().__init__()
+        self.executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'ASGI_THREADS', 16), thread_name_prefix='asgi-view')
+
+    async def run_sync(self, func, *args):
+        context = contextvars.copy_context()
+        return await asyncio.get_event_loop().run_in_executor(
+            self.executor, functools.partial(context.run, func, *args))
+
+    def handle_request(self, scope, request):
+        signals.request_started.send(sender=self.__class__, scope=scope)
+        return self.get_response(request)
+
+    def serve(self, scope, request, put):
+        """
+        Runs in the pool: handles the request, then put()s the response,
+        each batch of a streaming body and finally None. put() returns False
+        once the client is gone, which stops the streaming early.
+        """
+        response = None
+        try:
+            response = self.handle_request(scope, request)
+            response._handler_class = self.__class__
+            if isinstance(response, FileResponse):
+                response.block_size = self.chunk_size
+            if put(response) and response.streaming:
+                parts = iter(response)
+                while True:
+                    batch = list(islice(parts, self.streaming_batch_size))
+                    if not batch or not put(b''.join(batch)):
+                        break
+        finally:
+            # close() sends request_finished, whose handlers touch this thread's database connection.
+            if response is not None:
+                response.close()
+            put(None)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError('Django can only handle ASGI/HTTP connections, not %s.' % scope['type'])
+        try:
+            body_file = await self.read_body(receive)
+        except RequestAborted:
+            return
+        set_script_prefix(self.get_script_prefix(scope))
+        request, error_response = self.create_request(scope, body_file)
+        if request is None:
+            await self.send_response(error_response, send)
+            await self.run_sync(error_response.close)
+            return
+
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue(maxsize=self.streaming_queue_size)
+        abandoned = threading.Event()
+
+        def put(item):
+            if abandoned.is_set():
+                return False
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+            return True
+
+        job = asyncio.ensure_future(self.run_sync(self.serve, scope, request, put))
+        try:
+            response = await queue.get()
+            if response is not None:
+                await self.send_response(response, send, queue)
+        except BaseException:
+            abandoned.set()
+            raise
+        finally:
+            # Unblock a put() waiting on a full queue until the job has closed the response.
+            while not job.done():
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({job, getter}, return_when=asyncio.FIRST_COMPLETED)
+                getter.cancel()
+        job.result()
+
+    async def send_response(self, response, send, parts=None):
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            response_headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            response_headers.append((b'Set-Cookie', cookie.output(header='').encode('ascii').strip()))
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': response_headers})
+
+        if response.streaming:
+            while True:
+                body = await parts.get()
+                if body is None:
+                    break
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+            await send({'type': 'http.response.body'})
+        else:
+            for chunk, last in self.chunk_bytes(response.content):
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': not last})
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    return BoundedASGIHandler()
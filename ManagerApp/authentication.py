@@ -0,0 +1,130 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import router, transaction
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from . import hashers
+
+
+def token_cache_key(key):
+    return 'auth-token:%s' % hashlib.sha256(key.encode()).hexdigest()
+
+
+def token_cache():
+    return caches[getattr(settings, 'TOKEN_AUTH_CACHE_ALIAS', 'default')]
+
+
+def invalidate_token(key):
+    token_cache().delete(token_cache_key(key))
+
+
+def token_ttl():
+    return timedelta(seconds=getattr(settings, 'TOKEN_TTL', 60 * 60 * 24 * 7))
+
+
+def token_expires_at(token):
+    return token.created + token_ttl()
+
+
+def token_expired(token):
+    return token_expires_at(token) <= timezone.now()
+
+
+def issue_token(user):
+    """Return the user's live token, replacing it if it has expired."""
+    with transaction.atomic():
+        token, created = Token.objects.select_for_update().get_or_create(user=user)
+        if not created and token_expired(token):
+            return rotate_token(user)
+    return token
+
+
+def rotate_token(user):
+    """Replace the user's token with a fresh one."""
+    with transaction.atomic():
+        Token.objects.filter(user=user).delete()
+        return Token.objects.create(user=user)
+
+
+# User fields kept in the token cache; the password hash and the rest stay in the database.
+CACHED_USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+
+def cached_credentials(user, token):
+    return {
+        'user': {field: getattr(user, field) for field in CACHED_USER_FIELDS},
+        'token': (token.key, token.created),
+    }
+
+
+def credentials_from_cache(entry):
+    """(user, token) rebuilt from a cached_credentials() entry without a query."""
+    UserModel = get_user_model()
+    # from_db() marks the other fields deferred, so saving the user only writes the cached ones.
+    fields = [field.attname for field in UserModel._meta.concrete_fields if field.attname in entry['user']]
+    user = UserModel.from_db(router.db_for_read(UserModel), fields, [entry['user'][field] for field in fields])
+    key, created = entry['token']
+    token = Token(key=key, user=user, created=created)
+    token._state.adding = False
+    return user, token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that rejects tokens older than TOKEN_TTL and keeps
+    live ones in Django's cache for TOKEN_AUTH_CACHE_TIMEOUT seconds, so a
+    warm request does no Token/User query. Only the token and the user's
+    CACHED_USER_FIELDS are cached, never the password hash. Entries are
+    dropped when the token is deleted or its user is saved.
+    """
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        cache = token_cache()
+        entry = cache.get(cache_key)
+        if entry is None:
+            credentials = super().authenticate_credentials(key)
+            remaining = (token_expires_at(credentials[1]) - timezone.now()).total_seconds()
+            if remaining > 0:
+                cache.set(cache_key, cached_credentials(*credentials),
+                          min(getattr(settings, 'TOKEN_AUTH_CACHE_TIMEOUT', 300), int(remaining)))
+        else:
+            credentials = credentials_from_cache(entry)
+        if token_expired(credentials[1]):
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        return credentials
+
+
+class PooledPasswordBackend(ModelBackend):
+    """
+    ModelBackend that checks passwords in the hashing process pool (see
+    ManagerApp.hashers) and, for users allowed to sign in, saves the upgraded
+    hash when the stored one was made by an older hasher or with outdated
+    parameters.
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown usernames take as long as wrong passwords.
+            hashers.make_password(password)
+            return None
+        valid, upgraded = hashers.check_password(password, user.password)
+        if not valid or not self.user_can_authenticate(user):
+            return None
+        if upgraded:
+            user.password = upgraded
+            user.save(update_fields=['password'])
+        return user
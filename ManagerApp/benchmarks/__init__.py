@@ -0,0 +1,56 @@
+"""
+Benchmarks run by `manage.py benchmark` against a throwaway test database.
+
+Each benchmark is a function registered with @benchmark that takes the number
+of iterations and returns a dict of measurements, usually built with measure().
+"""
+import time
+from collections import OrderedDict
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarise(samples):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    total = sum(samples)
+    return OrderedDict([
+        ('iterations', len(samples)),
+        ('per_second', round(len(samples) / total, 1) if total else None),
+        ('mean_ms', round(total / len(samples) * 1000, 3)),
+        ('p50_ms', round(percentile(samples, 50) * 1000, 3)),
+        ('p95_ms', round(percentile(samples, 95) * 1000, 3)),
+        ('p99_ms', round(percentile(samples, 99) * 1000, 3)),
+    ])
+
+
+def measure(func, iterations, warmup=1):
+    """Call `func` repeatedly and report latency percentiles and queries per call."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+    result = summarise(samples)
+    result['queries_per_call'] = round(len(queries) / iterations, 2)
+    return result
+
+
+from . import api, auth, compression, database, scheduling, serialization, servers  # noqa: E402,F401
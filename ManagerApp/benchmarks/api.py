@@ -0,0 +1,211 @@
+import itertools
+import os
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ManagerApp import models
+from . import benchmark, measure
+
+
+# Multiplies every seeded volume below, e.g. BENCHMARK_SCALE=0.05 for a quick run.
+SCALE = float(os.environ.get('BENCHMARK_SCALE', 1))
+
+SEED_USERS = 2000
+SEED_MONEY_BUDGETS_PER_USER = 2
+SEED_TIME_BUDGETS_PER_USER = 1
+SEED_INCOMES = 50000
+SEED_EXPENSES = 50000
+SEED_TIME_SLOTS = 20000
+
+# Rows owned by the user the requests are made as; lists span several pages.
+OWNER_BUDGETS = 10
+OWNER_ENTRIES_PER_BUDGET = 50
+
+BATCH_SIZE = 5000
+PASSWORD = 'benchmark-password'
+
+
+def scaled(value):
+    return max(1, int(value * SCALE))
+
+
+def bulk_insert(model, objects):
+    """bulk_create an iterable of unsaved objects in BATCH_SIZE chunks without materialising it."""
+    objects = iter(objects)
+    count = 0
+    while True:
+        batch = list(islice(objects, BATCH_SIZE))
+        if not batch:
+            return count
+        model.objects.bulk_create(batch)
+        count += len(batch)
+
+
+def seed_budgets(owner_ids, money_budgets_per_owner, time_budgets_per_owner, entries_per_budget, slots_per_budget):
+    """
+    Bulk insert budgets for the owners, then entries_per_budget incomes and
+    expenses (amount 1.00) per money budget and slots_per_budget time slots per
+    time budget. The stored totals are written with the budgets so they match.
+    """
+    prefix = 'seed-%s-' % time.monotonic_ns()
+    bulk_insert(models.MoneyBudgetModel, (
+        models.MoneyBudgetModel(
+            owner_id=owner_id, money_budget_name='%s%d' % (prefix, i), income_total=entries_per_budget,
+            expense_total=entries_per_budget, entry_count=2 * entries_per_budget)
+        for owner_id in owner_ids for i in range(money_budgets_per_owner)))
+    bulk_insert(models.TimeBudgetModel, (
+        models.TimeBudgetModel(owner_id=owner_id, time_budget_name='%s%d' % (prefix, i))
+        for owner_id in owner_ids for i in range(time_budgets_per_owner)))
+
+    # SQLite's bulk_create does not return primary keys, so read them back.
+    money_budgets = list(models.MoneyBudgetModel.objects.filter(money_budget_name__startswith=prefix).values_list('id', 'owner_id'))
+    time_budgets = list(models.TimeBudgetModel.objects.filter(time_budget_name__startswith=prefix).values_list('id', 'owner_id'))
+    amount = Decimal('1.00')
+    return OrderedDict([
+        ('money_budgets', len(money_budgets)),
+        ('time_budgets', len(time_budgets)),
+        ('incomes', bulk_insert(models.ModelIncome, (
+            models.ModelIncome(owner_id=owner_id, model_budget_id=budget_id, model_income_name='income %d' % i, amount=amount)
+            for budget_id, owner_id in money_budgets for i in range(entries_per_budget)))),
+        ('expenses', bulk_insert(models.ModelExpense, (
+            models.ModelExpense(owner_id=owner_id, model_budget_id=budget_id, model_expense_name='expense %d' % i, amount=amount)
+            for budget_id, owner_id in money_budgets for i in range(entries_per_budget)))),
+        ('time_slots', bulk_insert(models.TimeSlotModel, (
+            models.TimeSlotModel(owner_id=owner_id, model_time_budget_id=budget_id, time_slot_name='slot %d' % i)
+            for budget_id, owner_id in time_budgets for i in range(slots_per_budget)))),
+    ])
+
+
+def seed_dataset():
+    """Seed the background population and the benchmark owner's own rows; returns the owner and row counts."""
+    password = make_password(PASSWORD)
+    users = scaled(SEED_USERS)
+    bulk_insert(User, (User(username='seed-user-%d' % i, password=password) for i in range(users)))
+    user_ids = list(User.objects.filter(username__startswith='seed-user-').values_list('id', flat=True))
+    money_budgets = users * SEED_MONEY_BUDGETS_PER_USER
+    time_budgets = users * SEED_TIME_BUDGETS_PER_USER
+    population = seed_budgets(
+        user_ids, SEED_MONEY_BUDGETS_PER_USER, SEED_TIME_BUDGETS_PER_USER,
+        max(1, scaled(SEED_INCOMES + SEED_EXPENSES) // 2 // money_budgets),
+        max(1, scaled(SEED_TIME_SLOTS) // time_budgets))
+
+    owner = User.objects.create(username='benchmark-api', password=password)
+    owned = seed_budgets([owner.pk], OWNER_BUDGETS, OWNER_BUDGETS, OWNER_ENTRIES_PER_BUDGET, OWNER_ENTRIES_PER_BUDGET)
+    dataset = OrderedDict([('users', users + 1)])
+    for key, value in population.items():
+        dataset[key] = value + owned[key]
+    return owner, dataset
+
+
+def delete_dataset():
+    # Children first, so the budget and user deletes have nothing to cascade to.
+    seeded = User.objects.filter(username__startswith='seed-user-') | User.objects.filter(username='benchmark-api')
+    for model in (models.ModelIncome, models.ModelExpense, models.TimeSlotModel, models.MoneyBudgetModel, models.TimeBudgetModel):
+        model.objects.filter(owner__in=seeded).delete()
+    seeded.delete()
+
+
+def call(method, url, expected, data=None):
+    """A request function for measure() that fails loudly if the endpoint misbehaves."""
+    def request():
+        response = method(url() if callable(url) else url, data() if callable(data) else data, format='json')
+        if response.status_code != expected:
+            raise AssertionError('%s %s returned %s, expected %s: %s' % (
+                method.__name__.upper(), response.request['PATH_INFO'], response.status_code, expected, response.content[:200]))
+    return request
+
+
+@benchmark
+def api_endpoints(iterations):
+    """
+    Latency percentiles, throughput and queries per request for signup,
+    signin and every list, detail, create, update and delete URL, against a
+    bulk-seeded dataset (SEED_* rows, scaled by BENCHMARK_SCALE). Requests go
+    through the full middleware and DRF stack via the test client; the list
+    cache is off so every list reaches the database, and throttling is off. Signup and signin hash a
+    password, so they run a tenth of the iterations.
+    """
+    owner, dataset = seed_dataset()
+    token = Token.objects.create(user=owner)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+    anonymous = APIClient()
+    money_budget = models.MoneyBudgetModel.objects.filter(owner=owner).first()
+    time_budget = models.TimeBudgetModel.objects.filter(owner=owner).first()
+    income = models.ModelIncome.objects.filter(owner=owner).first()
+    expense = models.ModelExpense.objects.filter(owner=owner).first()
+    time_slot = models.TimeSlotModel.objects.filter(owner=owner).first()
+    auth_iterations = max(1, iterations // 10)
+    # Rows for the delete measurements, one per call including measure()'s warmup.
+    doomed = {
+        'time_budget': iter([models.TimeBudgetModel.objects.create(owner=owner, time_budget_name='doomed') for _ in range(iterations + 1)]),
+        'money_budget': iter([models.MoneyBudgetModel.objects.create(owner=owner, money_budget_name='doomed') for _ in range(iterations + 1)]),
+        'income': iter([models.ModelIncome.objects.create(owner=owner, model_budget=money_budget, model_income_name='doomed') for _ in range(iterations + 1)]),
+        'expense': iter([models.ModelExpense.objects.create(owner=owner, model_budget=money_budget, model_expense_name='doomed') for _ in range(iterations + 1)]),
+        'time_slot': iter([models.TimeSlotModel.objects.create(owner=owner, model_time_budget=time_budget, time_slot_name='doomed') for _ in range(iterations + 1)]),
+    }
+    usernames = ('benchmark-signup-%d' % i for i in itertools.count())
+
+    def doomed_url(name, kind):
+        return lambda: reverse(name, kwargs={'pk': next(doomed[kind]).pk})
+
+    def detail(name, obj):
+        return reverse(name, kwargs={'pk': obj.pk})
+
+    requests = OrderedDict([
+        ('signup', (call(anonymous.post, reverse('signup'), 201, lambda: {
+            'username': next(usernames), 'email': 'bench@example.com', 'password': PASSWORD}), auth_iterations)),
+        ('signin', (call(anonymous.post, reverse('signin'), 200, {'username': owner.username, 'password': PASSWORD}), auth_iterations)),
+
+        ('time_budget_list', (call(client.get, reverse('time_budget_model'), 200), iterations)),
+        ('time_budget_create', (call(client.post, reverse('time_budget_model'), 201, {'time_budget_name': 'created'}), iterations)),
+        ('time_budget_retrieve', (call(client.get, detail('time_budget_model_details', time_budget), 200), iterations)),
+        ('time_budget_update', (call(client.patch, detail('time_budget_model_details', time_budget), 200, {'time_budget_name': 'updated'}), iterations)),
+        ('time_budget_delete', (call(client.delete, doomed_url('time_budget_model_details', 'time_budget'), 204), iterations)),
+
+        ('money_budget_list', (call(client.get, reverse('money_budget_model'), 200), iterations)),
+        ('money_budget_create', (call(client.post, reverse('money_budget_model'), 201, {'money_budget_name': 'created'}), iterations)),
+        ('money_budget_retrieve', (call(client.get, detail('money_budget_details', money_budget), 200), iterations)),
+        ('money_budget_summary', (call(client.get, detail('money_budget_summary', money_budget), 200), iterations)),
+        ('money_budget_update', (call(client.patch, detail('money_budget_details', money_budget), 200, {'money_budget_name': 'updated'}), iterations)),
+        ('money_budget_delete', (call(client.delete, doomed_url('money_budget_details', 'money_budget'), 204), iterations)),
+
+        ('income_list', (call(client.get, reverse('model_income_list_create'), 200), iterations)),
+        ('income_create', (call(client.post, reverse('model_income_list_create'), 201, {
+            'model_income_name': 'created', 'model_budget': money_budget.pk, 'amount': '1.00'}), iterations)),
+        ('income_retrieve', (call(client.get, detail('model_income_details', income), 200), iterations)),
+        ('income_update', (call(client.patch, detail('model_income_details', income), 200, {'amount': '2.00'}), iterations)),
+        ('income_delete', (call(client.delete, doomed_url('model_income_details', 'income'), 204), iterations)),
+
+        ('expense_list', (call(client.get, reverse('model_expense_list_create'), 200), iterations)),
+        ('expense_create', (call(client.post, reverse('model_expense_list_create'), 201, {
+            'model_expense_name': 'created', 'model_budget': money_budget.pk, 'amount': '1.00'}), iterations)),
+        ('expense_retrieve', (call(client.get, detail('model_expense_details', expense), 200), iterations)),
+        ('expense_update', (call(client.patch, detail('model_expense_details', expense), 200, {'amount': '2.00'}), iterations)),
+        ('expense_delete', (call(client.delete, doomed_url('model_expense_details', 'expense'), 204), iterations)),
+
+        ('time_slot_list', (call(client.get, reverse('time_slot_model_list_create'), 200), iterations)),
+        ('time_slot_create', (call(client.post, reverse('time_slot_model_list_create'), 201, {
+            'time_slot_name': 'created', 'model_time_budget': time_budget.pk}), iterations)),
+        ('time_slot_retrieve', (call(client.get, detail('time_slot_model_details', time_slot), 200), iterations)),
+        ('time_slot_update', (call(client.patch, detail('time_slot_model_details', time_slot), 200, {'time_slot_name': 'updated'}), iterations)),
+        ('time_slot_delete', (call(client.delete, doomed_url('time_slot_model_details', 'time_slot'), 204), iterations)),
+    ])
+    results = OrderedDict([('dataset', dataset)])
+    try:
+        with override_settings(LIST_CACHE_TIMEOUT=0, THROTTLE_ENABLED=False):
+            for name, (request, count) in requests.items():
+                results[name] = measure(request, count)
+    finally:
+        User.objects.filter(username__startswith='benchmark-signup-').delete()
+        delete_dataset()
+    return results
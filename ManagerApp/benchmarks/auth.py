@@ -0,0 +1,65 @@
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ManagerApp.authentication import CachedTokenAuthentication, invalidate_token
+from ManagerApp.throttling import throttle_cache
+from . import benchmark, measure
+
+
+@benchmark
+def token_authentication(iterations):
+    """Token lookup cost with and without the authentication cache."""
+    user = User.objects.create(username='benchmark-auth')
+    token = Token.objects.create(user=user)
+    invalidate_token(token.key)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+    try:
+        return {
+            'uncached': measure(lambda: TokenAuthentication().authenticate_credentials(token.key), iterations),
+            'cached': measure(lambda: CachedTokenAuthentication().authenticate_credentials(token.key), iterations),
+            'time_budget_list_request': measure(lambda: client.get(reverse('time_budget_model')), iterations),
+        }
+    finally:
+        user.delete()
+
+
+@benchmark
+def throttling(iterations):
+    """
+    What the token buckets cost: a time budget list request with and
+    without throttling, and a refused signin, which is answered from the
+    cache before the view or any password hashing runs.
+    """
+    user = User.objects.create(username='benchmark-throttling')
+    token = Token.objects.create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+    anonymous = APIClient()
+    signin = {'username': user.username, 'password': 'wrong'}
+
+    def refused_signin():
+        response = anonymous.post(reverse('signin'), signin, format='json')
+        if response.status_code != 429:
+            raise AssertionError('signin returned %s, expected 429' % response.status_code)
+
+    try:
+        with override_settings(THROTTLE_RATE='1000000/s', THROTTLE_BURST=1000000):
+            throttled = measure(lambda: client.get(reverse('time_budget_model')), iterations)
+        with override_settings(THROTTLE_ENABLED=False):
+            unthrottled = measure(lambda: client.get(reverse('time_budget_model')), iterations)
+        throttle_cache().clear()
+        while anonymous.post(reverse('signin'), signin, format='json').status_code != 429:
+            pass
+        return {
+            'time_budget_list_throttled': throttled,
+            'time_budget_list_unthrottled': unthrottled,
+            'signin_refused': measure(refused_signin, iterations),
+        }
+    finally:
+        throttle_cache().clear()
+        user.delete()
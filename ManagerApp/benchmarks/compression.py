@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ManagerApp import compression, models
+from . import benchmark, measure
+from .api import OWNER_BUDGETS, OWNER_ENTRIES_PER_BUDGET, seed_budgets
+
+
+def body(response):
+    return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+def compressed_size(content, encoding):
+    compressor = compression.Compressor(encoding, compression.compression_settings())
+    return len(compressor.compress(content) + compressor.finish())
+
+
+@benchmark
+def response_compression(iterations):
+    """
+    Bytes on the wire per endpoint as identity, gzip, br (when brotli is
+    installed) and ?compact=1, the CPU time compressing each body takes, and
+    full request latency with and without Accept-Encoding: gzip. Bodies
+    under COMPRESSION_MIN_SIZE show up with equal identity and gzip sizes.
+    """
+    owner = User.objects.create(username='benchmark-compression')
+    seed_budgets([owner.pk], OWNER_BUDGETS, OWNER_BUDGETS, OWNER_ENTRIES_PER_BUDGET, OWNER_ENTRIES_PER_BUDGET)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=owner).key)
+    money_budget = models.MoneyBudgetModel.objects.filter(owner=owner).first()
+    time_budget = models.TimeBudgetModel.objects.filter(owner=owner).first()
+    urls = OrderedDict([
+        ('money_budget_list', reverse('money_budget_model')),
+        ('money_budget_detail', reverse('money_budget_details', kwargs={'pk': money_budget.pk})),
+        ('money_budget_snapshot', reverse('money_budget_snapshot', kwargs={'pk': money_budget.pk})),
+        ('money_budget_report', reverse('money_budget_report')),
+        ('time_budget_list', reverse('time_budget_model')),
+        ('time_budget_snapshot', reverse('time_budget_snapshot', kwargs={'pk': time_budget.pk})),
+        ('income_list', reverse('model_income_list_create')),
+        ('expense_list', reverse('model_expense_list_create')),
+        ('time_slot_list', reverse('time_slot_model_list_create')),
+        ('ledger_export_csv', reverse('ledger_export', kwargs={'export_format': 'csv'})),
+        ('ledger_export_ndjson', reverse('ledger_export', kwargs={'export_format': 'ndjson'})),
+    ])
+    encodings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+    results = OrderedDict([('brotli_installed', compression.brotli is not None)])
+    try:
+        with override_settings(LIST_CACHE_TIMEOUT=0, THROTTLE_ENABLED=False):
+            for name, url in urls.items():
+                content = body(client.get(url))
+                compact = body(client.get(url, {'compact': 1}))
+                result = OrderedDict([('identity_bytes', len(content)), ('compact_bytes', len(compact))])
+                for encoding in encodings:
+                    wire = body(client.get(url, HTTP_ACCEPT_ENCODING=encoding))
+                    result['%s_bytes' % encoding] = len(wire)
+                    result['%s_ratio' % encoding] = round(len(wire) / len(content), 3) if content else None
+                    result['compact_%s_bytes' % encoding] = compressed_size(compact, encoding)
+                    result['%s_compress' % encoding] = measure(lambda: compressed_size(content, encoding), iterations)
+                result['request_identity'] = measure(lambda: body(client.get(url)), iterations)
+                result['request_gzip'] = measure(lambda: body(client.get(url, HTTP_ACCEPT_ENCODING='gzip')), iterations)
+                results[name] = result
+        return results
+    finally:
+        models.ModelIncome.objects.filter(owner=owner).delete()
+        models.ModelExpense.objects.filter(owner=owner).delete()
+        models.TimeSlotModel.objects.filter(owner=owner).delete()
+        owner.delete()
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection, transaction
+
+from ManagerApp import models
+from . import benchmark, summarise
+
+
+WRITER_THREADS = 8
+
+
+@benchmark
+def concurrent_writes(iterations):
+    """
+    Write throughput with WRITER_THREADS threads, each on its own connection,
+    creating incomes and updating their budget's totals the way the views do.
+
+    Run it once per database profile to compare them, e.g.
+        DB_ENGINE=postgresql DB_NAME=manager ./manage.py benchmark concurrent_writes
+        DB_TEST_NAME=/tmp/bench.sqlite3 ./manage.py benchmark concurrent_writes
+    (SQLite's default in-memory test database cannot show WAL behaviour.)
+    """
+    user = User.objects.create(username='benchmark-writes')
+    budgets = [models.MoneyBudgetModel.objects.create(owner=user, money_budget_name='budget %d' % i) for i in range(WRITER_THREADS)]
+    per_thread = max(1, iterations // WRITER_THREADS)
+    samples = []
+    errors = []
+    lock = threading.Lock()
+
+    def writer(model_budget):
+        local_samples, local_errors = [], 0
+        try:
+            for i in range(per_thread):
+                started = time.perf_counter()
+                try:
+                    with transaction.atomic():
+                        models.ModelIncome.objects.create(owner=user, model_budget=model_budget, model_income_name='income %d' % i, amount=1)
+                        models.MoneyBudgetModel.objects.filter(pk=model_budget.pk).adjust_totals(income_total=1, entry_count=1)
+                except DatabaseError:
+                    local_errors += 1
+                    continue
+                local_samples.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        with lock:
+            samples.extend(local_samples)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=writer, args=(model_budget,)) for model_budget in budgets]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    try:
+        result = summarise(samples) if samples else {'iterations': 0}
+        result['per_second'] = round(len(samples) / elapsed, 1)
+        result['threads'] = WRITER_THREADS
+        result['failed_writes'] = sum(errors)
+        result['vendor'] = connection.vendor
+        result['journal_mode'] = connection.settings_dict.get('JOURNAL_MODE')
+        return result
+    finally:
+        user.delete()
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from ManagerApp import models, scheduling
+from . import benchmark, measure
+
+
+CALENDAR_BUDGETS = 5
+CALENDAR_SLOTS_PER_BUDGET = 10000
+
+
+@benchmark
+def free_busy(iterations):
+    """
+    Free/busy queries over CALENDAR_BUDGETS time budgets of
+    CALENDAR_SLOTS_PER_BUDGET half-hour slots each: a week's merged busy
+    list with cold and warm busy caches, and finding free windows in it.
+    """
+    user = User.objects.create(username='benchmark-scheduling')
+    budgets = [models.TimeBudgetModel.objects.create(owner=user, time_budget_name='budget %d' % i) for i in range(CALENDAR_BUDGETS)]
+    origin = timezone.now().replace(minute=0, second=0, microsecond=0)
+    for offset, time_budget in enumerate(budgets):
+        models.TimeSlotModel.objects.bulk_create([
+            models.TimeSlotModel(
+                owner=user, model_time_budget=time_budget, time_slot_name='slot %d' % i,
+                start_time=origin + timedelta(hours=2 * i + offset * 0.25), end_time=origin + timedelta(hours=2 * i + offset * 0.25 + 0.5))
+            for i in range(CALENDAR_SLOTS_PER_BUDGET)
+        ])
+    budget_ids = [time_budget.pk for time_budget in budgets]
+    start = origin + timedelta(days=180)
+    end = start + timedelta(days=7)
+    busy = scheduling.busy_between(budget_ids, start, end)
+
+    def cold():
+        scheduling.invalidate_busy(budget_ids)
+        scheduling.busy_between(budget_ids, start, end)
+
+    try:
+        return {
+            'busy_between_cold': measure(cold, iterations),
+            'busy_between_warm': measure(lambda: scheduling.busy_between(budget_ids, start, end), iterations),
+            'free_windows': measure(lambda: scheduling.free_windows(busy, start, end, timedelta(minutes=45), 10), iterations),
+            'busy_intervals_in_week': len(busy),
+        }
+    finally:
+        user.delete()
@@ -0,0 +1,43 @@
+from django.contrib.auth.models import User
+from rest_framework.renderers import JSONRenderer
+
+from ManagerApp import models, serializers
+from ManagerApp.renderers import FastJSONRenderer
+from . import benchmark, measure
+
+
+ROWS = 1000
+
+
+def rows_per_second(result):
+    result['rows_per_second'] = round(result['per_second'] * ROWS) if result['per_second'] else None
+    return result
+
+
+@benchmark
+def list_serialization(iterations):
+    """
+    Rows/second turning ROWS incomes into a JSON body: the full
+    ModelIncomeSerializer over model instances against the lean serializer
+    over values() rows (each including its query), and JSONRenderer against
+    FastJSONRenderer on the resulting data.
+    """
+    user = User.objects.create(username='benchmark-serialization')
+    model_budget = models.MoneyBudgetModel.objects.create(owner=user, money_budget_name='benchmark')
+    models.ModelIncome.objects.bulk_create([
+        models.ModelIncome(owner=user, model_budget=model_budget, model_income_name='income %d' % i, amount=i)
+        for i in range(ROWS)
+    ])
+    queryset = models.ModelIncome.objects.filter(owner=user).order_by('date_created', 'id')
+    lean = serializers.LeanModelIncomeSerializer
+    data = lean(queryset.values(*lean.columns()), many=True).data
+    try:
+        return {
+            'rows': ROWS,
+            'full_serializer': rows_per_second(measure(lambda: serializers.ModelIncomeSerializer(queryset.all(), many=True).data, iterations)),
+            'lean_serializer': rows_per_second(measure(lambda: lean(queryset.values(*lean.columns()), many=True).data, iterations)),
+            'json_renderer': rows_per_second(measure(lambda: JSONRenderer().render(data), iterations)),
+            'fast_json_renderer': rows_per_second(measure(lambda: FastJSONRenderer().render(data), iterations)),
+        }
+    finally:
+        user.delete()
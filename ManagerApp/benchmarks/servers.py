@@ -0,0 +1,154 @@
+import http.client
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from ManagerApp import models
+from ManagerApp.asgi import BoundedASGIHandler
+from ManagerApp.hashers import setup_worker
+from . import benchmark, summarise
+
+try:
+    import uvicorn
+except ImportError:  # Optional (requirements-optional.txt); without it only WSGI is measured.
+    uvicorn = None
+
+
+CLIENTS = 32
+
+
+def http_client(port, path, authorization, requests):
+    """
+    One client making `requests` GETs over a keep-alive connection. Returns
+    the durations and how many responses closed the connection; any response
+    other than 2xx fails the benchmark.
+    """
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    samples, closed = [], 0
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            connection.request('GET', path, headers={'Authorization': authorization})
+            response = connection.getresponse()
+            body = response.read()
+            samples.append(time.perf_counter() - started)
+            if not 200 <= response.status < 300:
+                raise AssertionError('GET %s answered %d: %r' % (path, response.status, body[:200]))
+            closed += response.will_close
+    finally:
+        connection.close()
+    return samples, closed
+
+
+def run_clients(port, path, authorization, per_client):
+    """CLIENTS concurrent clients on threads of the calling process."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(CLIENTS) as executor:
+        results = [future.result() for future in [
+            executor.submit(http_client, port, path, authorization, per_client) for _ in range(CLIENTS)]]
+    elapsed = time.perf_counter() - started
+    return [sample for samples, _ in results for sample in samples], sum(closed for _, closed in results), elapsed
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class BenchmarkWSGIServer(ThreadedWSGIServer):
+    # Room for every client to connect at once; the default backlog of 10
+    # leaves the rest retrying their SYN after a second.
+    request_queue_size = 2 * CLIENTS
+
+
+def start_wsgi():
+    """Django's threaded WSGI server (runserver's, a thread per connection) with keep-alive."""
+    server = BenchmarkWSGIServer(('127.0.0.1', 0), QuietWSGIRequestHandler)
+    server.set_app(WSGIHandler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        server.server_close()
+    return server.server_address[1], stop
+
+
+def start_asgi():
+    """uvicorn serving BoundedASGIHandler."""
+    application = BoundedASGIHandler()
+    server = uvicorn.Server(uvicorn.Config(
+        application, interface='asgi3', lifespan='off', access_log=False, log_level='warning', backlog=2 * CLIENTS))
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+        application.executor.shutdown()
+    return sock.getsockname()[1], stop
+
+
+@benchmark
+def asgi_vs_wsgi(iterations):
+    """
+    Requests/second and latency of the list and detail read paths through
+    uvicorn serving Manager.asgi's BoundedASGIHandler and Django's threaded
+    WSGI server, both listening on localhost. The load comes from CLIENTS
+    keep-alive HTTP clients in a separate process, so they do not compete
+    with the server for the GIL, and every response must be a 2xx.
+    closed_connections counts responses that did not keep the connection
+    open. The list cache is off so every request reaches the database, and
+    throttling is off.
+    """
+    user = User.objects.create(username='benchmark-servers')
+    token = Token.objects.create(user=user)
+    model_budget = models.MoneyBudgetModel.objects.create(owner=user, money_budget_name='benchmark')
+    models.ModelIncome.objects.bulk_create([
+        models.ModelIncome(owner=user, model_budget=model_budget, model_income_name='income %d' % i, amount=i)
+        for i in range(200)
+    ])
+    authorization = 'Token ' + token.key
+    per_client = max(1, iterations // CLIENTS)
+    paths = {
+        'list': reverse('model_income_list_create'),
+        'detail': reverse('money_budget_details', kwargs={'pk': model_budget.pk}),
+    }
+    servers = [('asgi', start_asgi)] if uvicorn is not None else []
+    servers.append(('wsgi', start_wsgi))
+    results = {'asgi_server': 'uvicorn %s' % uvicorn.__version__ if uvicorn is not None else 'uvicorn is not installed'}
+    load = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn'), initializer=setup_worker,
+                               initargs=(os.environ['DJANGO_SETTINGS_MODULE'],))
+    try:
+        with override_settings(ALLOWED_HOSTS=['127.0.0.1'], LIST_CACHE_TIMEOUT=0, THROTTLE_ENABLED=False):
+            for server, start in servers:
+                port, stop = start()
+                try:
+                    for name, path in paths.items():
+                        load.submit(run_clients, port, path, authorization, 1).result()
+                        samples, closed, elapsed = load.submit(run_clients, port, path, authorization, per_client).result()
+                        result = summarise(samples)
+                        result['per_second'] = round(len(samples) / elapsed, 1)
+                        result['clients'] = CLIENTS
+                        result['closed_connections'] = closed
+                        results['%s_%s' % (name, server)] = result
+                finally:
+                    stop()
+    finally:
+        load.shutdown()
+        user.delete()
+    return results
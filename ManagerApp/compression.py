@@ -0,0 +1,123 @@
+import time
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from . import instrumentation
+
+try:
+    import brotli
+except ImportError:  # Optional; without it only gzip is offered.
+    brotli = None
+
+
+def compression_settings():
+    return {
+        'min_size': getattr(settings, 'COMPRESSION_MIN_SIZE', 1024),
+        'content_types': getattr(settings, 'COMPRESSION_CONTENT_TYPES', ('application/json', 'application/x-ndjson', 'text/')),
+        'gzip_level': getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6),
+        'brotli_quality': getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5),
+        'streaming_flush_size': getattr(settings, 'COMPRESSION_STREAMING_FLUSH_SIZE', 16 * 1024),
+    }
+
+
+def accepted_encodings(header):
+    """Codings from an Accept-Encoding header mapped to their q-values."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(header):
+    """br when brotli is installed and the client accepts it, else gzip, else None."""
+    accepted = accepted_encodings(header)
+    offered = (['br'] if brotli is not None else []) + ['gzip']
+    candidates = [(accepted.get(coding, accepted.get('*', 0)), -index, coding) for index, coding in enumerate(offered)]
+    quality, _, coding = max(candidates)
+    return coding if quality > 0 else None
+
+
+class Compressor:
+    """Incremental gzip or brotli compressor."""
+    def __init__(self, encoding, options):
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=options['brotli_quality'])
+            self.compress, self.flush, self.finish = self.compressor.process, self.compressor.flush, self.compressor.finish
+        else:
+            self.compressor = zlib.compressobj(options['gzip_level'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress, self.finish = self.compressor.compress, self.compressor.flush
+            self.flush = lambda: self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli response compression negotiated from Accept-Encoding.
+
+    Bodies smaller than COMPRESSION_MIN_SIZE bytes, content types outside
+    COMPRESSION_CONTENT_TYPES and responses that already carry a
+    Content-Encoding are sent as they are. Streaming responses (ledger
+    exports) are compressed as they are produced and flushed every
+    COMPRESSION_STREAMING_FLUSH_SIZE bytes of input, so nothing is buffered
+    whole. Compression time is added to the request metrics.
+
+    ETags are left strong: they are derived from the resource state rather
+    than the body bytes, and Vary: Accept-Encoding keeps the codings apart
+    in caches, so If-Match keeps working for clients that read compressed
+    responses.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        options = compression_settings()
+        if response.has_header('Content-Encoding') or not response.get('Content-Type', '').startswith(options['content_types']):
+            return response
+        if not response.streaming and len(response.content) < options['min_size']:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self.compress_stream(response.streaming_content, encoding, options)
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            started = time.perf_counter()
+            compressor = Compressor(encoding, options)
+            compressed = compressor.compress(response.content) + compressor.finish()
+            instrumentation.add_compression_time(time.perf_counter() - started)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def compress_stream(parts, encoding, options):
+        compressor = Compressor(encoding, options)
+        pending = 0
+        for part in parts:
+            chunk = compressor.compress(part)
+            pending += len(part)
+            if pending >= options['streaming_flush_size']:
+                chunk += compressor.flush()
+                pending = 0
+            if chunk:
+                yield chunk
+        yield compressor.finish()
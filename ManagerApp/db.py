@@ -0,0 +1,12 @@
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply the SQLite profile's journal mode to every new connection."""
+    if connection.vendor != 'sqlite':
+        return
+    journal_mode = connection.settings_dict.get('JOURNAL_MODE')
+    if journal_mode:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=%s' % journal_mode)
+            if journal_mode.upper() == 'WAL':
+                # Durable at checkpoints only, which is safe in WAL mode and avoids an fsync per commit.
+                cursor.execute('PRAGMA synchronous=NORMAL')
+
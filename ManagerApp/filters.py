@@ -0,0 +1,58 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+# The widest primary key any supported database has (bigint, SQLite's INTEGER).
+MAX_ID = 2 ** 63 - 1
+
+
+def parse_bound(value, param, end_of_day=False):
+    """
+    A datetime or date query parameter as an aware datetime. A bare date
+    stands for the start of that day, or with end_of_day for the start of the
+    next one, so ?until=2020-05-31 includes the whole of May 31st.
+    """
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError
+            parsed = datetime.combine(day + timedelta(days=1) if end_of_day else day, time.min)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        # Queries take it in UTC, which must be in range too.
+        parsed.astimezone(timezone.utc)
+    except (ValueError, OverflowError):
+        raise ValidationError({param: ['Enter a valid date or datetime (YYYY-MM-DD or ISO 8601).']})
+    return parsed
+
+
+def is_id(value):
+    """Whether a query parameter is a primary key value: digits within a signed 64-bit integer."""
+    # Length first: int() refuses strings of thousands of digits with ValueError.
+    return value.isascii() and value.isdigit() and len(value) <= len(str(MAX_ID)) and int(value) <= MAX_ID
+
+
+def filter_date_created(request, queryset):
+    """Restrict queryset to ?since= (inclusive) and ?until= (exclusive) on date_created."""
+    since = request.query_params.get('since')
+    until = request.query_params.get('until')
+    if since:
+        queryset = queryset.filter(date_created__gte=parse_bound(since, 'since'))
+    if until:
+        queryset = queryset.filter(date_created__lt=parse_bound(until, 'until', end_of_day=True))
+    return queryset
+
+
+class DateCreatedRangeFilter(BaseFilterBackend):
+    """
+    ?since=/?until= filtering on date_created. The range is applied in SQL
+    and is served by the (owner, date_created, id) indexes.
+    """
+    def filter_queryset(self, request, queryset, view):
+        return filter_date_created(request, queryset)
@@ -0,0 +1,155 @@
+import base64
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.crypto import constant_time_compare
+from django.utils.translation import gettext_noop as _
+
+
+logger = logging.getLogger(__name__)
+
+class ScryptPasswordHasher(hashers.BasePasswordHasher):
+    """
+    Memory-hard scrypt hasher on the standard library's hashlib.scrypt, for
+    deployments without argon2-cffi. Changing the parameters below makes
+    existing hashes be upgraded on the user's next sign in.
+    """
+    algorithm = 'scrypt'
+    work_factor = 2 ** 14
+    block_size = 8
+    parallelism = 1
+    maxmem = 64 * 1024 * 1024
+
+    def encode(self, password, salt, work_factor=None, block_size=None, parallelism=None):
+        assert password is not None
+        assert salt and '$' not in salt
+        work_factor = work_factor or self.work_factor
+        block_size = block_size or self.block_size
+        parallelism = parallelism or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(), salt=salt.encode(), n=work_factor, r=block_size, p=parallelism, maxmem=self.maxmem, dklen=64)
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, work_factor, salt, block_size, parallelism, hash_)
+
+    def decode(self, encoded):
+        algorithm, work_factor, salt, block_size, parallelism, hash_ = encoded.split('$', 5)
+        assert algorithm == self.algorithm
+        return {
+            'algorithm': algorithm, 'work_factor': int(work_factor), 'salt': salt,
+            'block_size': int(block_size), 'parallelism': int(parallelism), 'hash': hash_,
+        }
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        encoded_2 = self.encode(password, decoded['salt'], decoded['work_factor'], decoded['block_size'], decoded['parallelism'])
+        return constant_time_compare(encoded, encoded_2)
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+        return OrderedDict([
+            (_('algorithm'), decoded['algorithm']),
+            (_('work factor'), decoded['work_factor']),
+            (_('block size'), decoded['block_size']),
+            (_('parallelism'), decoded['parallelism']),
+            (_('salt'), hashers.mask_hash(decoded['salt'])),
+            (_('hash'), hashers.mask_hash(decoded['hash'])),
+        ])
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        return (decoded['work_factor'], decoded['block_size'], decoded['parallelism']) != (
+            self.work_factor, self.block_size, self.parallelism)
+
+    def harden_runtime(self, password, encoded):
+        # The work factor is fixed per hash rather than incremented over time.
+        pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def setup_worker(settings_module):
+    # Workers start from a fresh interpreter, not a copy of the server.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def pool_context():
+    """
+    forkserver where the platform has it, else spawn; never fork. The pool is
+    created lazily inside a threaded server, and a forked worker would
+    inherit the database sockets and locks other threads hold at the time.
+    """
+    return multiprocessing.get_context('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+
+def hashing_pool():
+    """
+    The process pool password hashing runs in, PASSWORD_HASHING_PROCESSES
+    workers (None when set to 0, meaning hash in the calling thread).
+    Workers read settings once, when they start.
+    """
+    global _pool
+    processes = getattr(settings, 'PASSWORD_HASHING_PROCESSES', os.cpu_count())
+    if not processes:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=processes, mp_context=pool_context(), initializer=setup_worker,
+                initargs=(os.environ['DJANGO_SETTINGS_MODULE'],))
+        return _pool
+
+
+def discard_pool(broken):
+    """Forget a pool whose worker died, unless another thread already replaced it."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False)
+
+
+def run_hashing(func, *args):
+    """
+    Run func in the hashing pool. A pool broken by a dead worker (OOM kill,
+    segfault) is replaced and the call retried once; if the new pool breaks
+    too, the call runs in the calling thread.
+    """
+    for attempt in range(2):
+        pool = hashing_pool()
+        if pool is None:
+            break
+        try:
+            return pool.submit(func, *args).result()
+        except BrokenProcessPool:
+            logger.warning('Password hashing pool broke, replacing it (attempt %d).', attempt + 1)
+            discard_pool(pool)
+    return func(*args)
+
+
+def check_and_upgrade(password, encoded):
+    """Check the password; also return a new hash when the stored one uses an outdated hasher or parameters."""
+    upgraded = []
+    valid = hashers.check_password(password, encoded, setter=lambda raw_password: upgraded.append(hashers.make_password(raw_password)))
+    return valid, upgraded[0] if upgraded else None
+
+
+def make_password(password):
+    """django.contrib.auth.hashers.make_password, run in the hashing pool."""
+    return run_hashing(hashers.make_password, password)
+
+
+def check_password(password, encoded):
+    """check_and_upgrade, run in the hashing pool; returns (valid, new hash or None)."""
+    return run_hashing(check_and_upgrade, password, encoded)
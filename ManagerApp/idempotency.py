@@ -0,0 +1,103 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import response, status
+from rest_framework.utils import encoders
+
+from . import models
+
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+
+def idempotency_key_ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24))
+
+
+def request_fingerprint(request):
+    """sha256 of the method, path and parsed body, so a key cannot be reused for a different request."""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    body = json.dumps(data, sort_keys=True, cls=encoders.JSONEncoder)
+    return hashlib.sha256(('%s %s %s' % (request.method, request.path, body)).encode()).hexdigest()
+
+
+class IdempotentCreateMixin:
+    """
+    Idempotency-Key support for create views. The first request with a key
+    claims it by inserting an IdempotencyKey row in the same transaction as
+    the create, and stores the 2xx response it produced there. Retries with
+    the same key and request get that response back (with an
+    Idempotent-Replayed header) without the view's models being touched; a
+    different request under the same key is refused with 422.
+
+    A retry arriving while the first request is still running waits on the
+    key's unique index and then replays, or gets 409 on databases that
+    refuse instead of waiting. Keys live for IDEMPOTENCY_KEY_TTL seconds and
+    are deleted by the purge_idempotency_keys command. Failed creates leave
+    no key behind, so they can be retried.
+    """
+    idempotency_key_max_length = 255
+
+    def create(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > self.idempotency_key_max_length:
+            return response.Response(
+                {'error': 'Idempotency-Key must be at most %d characters' % self.idempotency_key_max_length},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        with transaction.atomic():
+            record, claimed = self.claim_idempotency_key(request.user, key, fingerprint)
+            if record is None or (not claimed and record.status_code is None):
+                return response.Response({'error': 'A request with this Idempotency-Key is in progress'},
+                                         status=status.HTTP_409_CONFLICT)
+            if not claimed:
+                if record.fingerprint != fingerprint:
+                    return response.Response({'error': 'Idempotency-Key was already used for a different request'},
+                                             status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+                data = json.loads(record.response_body)
+                replayed = response.Response(data, status=record.status_code, headers=self.get_replay_headers(data))
+                replayed['Idempotent-Replayed'] = 'true'
+                return replayed
+
+            created = super().create(request, *args, **kwargs)
+            if status.is_success(created.status_code):
+                record.status_code = created.status_code
+                record.response_body = json.dumps(created.data, cls=encoders.JSONEncoder)
+                record.save(update_fields=['status_code', 'response_body'])
+            else:
+                record.delete()
+            return created
+
+    def get_replay_headers(self, data):
+        # CreateModelMixin's Location header; views without it (bulk creates) send none.
+        get_success_headers = getattr(self, 'get_success_headers', None)
+        return get_success_headers(data) if get_success_headers is not None else {}
+
+    @staticmethod
+    def claim_idempotency_key(user, key, fingerprint):
+        """
+        (record, True) when the key was free and is now held by a new row,
+        (record, False) with the live row holding it, or (None, False) when a
+        concurrent request claimed it first. An expired row is replaced.
+        """
+        now = timezone.now()
+        for attempt in range(2):
+            record = models.IdempotencyKey(owner=user, key=key, fingerprint=fingerprint, expires_at=now + idempotency_key_ttl())
+            try:
+                with transaction.atomic():
+                    record.save(force_insert=True)
+                return record, True
+            except IntegrityError:
+                existing = models.IdempotencyKey.objects.filter(owner=user, key=key).first()
+                if existing is None or existing.expires_at > now or attempt:
+                    return existing, False
+                existing.delete()
@@ -0,0 +1,157 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('ManagerApp.requests')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+METRICS = ('wall_ms', 'queries', 'db_ms', 'serializer_ms', 'compress_ms', 'bytes')
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.compression_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Database execute wrapper: counts and times every query of the request.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))]
+
+
+class Histograms:
+    """Rolling window of the last REQUEST_METRICS_WINDOW samples per URL name and metric."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: {metric: deque(maxlen=self.window()) for metric in METRICS})
+
+    @staticmethod
+    def window():
+        return getattr(settings, 'REQUEST_METRICS_WINDOW', 1000)
+
+    def add(self, url_name, record):
+        with self.lock:
+            series = self.samples[url_name]
+            for metric in METRICS:
+                if record.get(metric) is not None:
+                    series[metric].append(record[metric])
+
+    def snapshot(self):
+        with self.lock:
+            samples = {url_name: {metric: sorted(values) for metric, values in series.items()}
+                       for url_name, series in self.samples.items()}
+        report = {}
+        for url_name, series in sorted(samples.items()):
+            report[url_name] = {'count': len(series['wall_ms'])}
+            for metric, values in series.items():
+                if values:
+                    report[url_name][metric] = {
+                        'p50': percentile(values, 50), 'p95': percentile(values, 95), 'p99': percentile(values, 99)}
+        return report
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+
+histograms = Histograms()
+
+
+class timed_serialization:
+    """
+    Adds the time spent inside the block to the current request's serializer
+    time. Nested blocks (a list serializer calling its child) count once.
+    """
+    def __enter__(self):
+        self.metrics = _current.get()
+        if self.metrics is not None:
+            self.metrics.serializer_depth += 1
+            self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.metrics is not None:
+            self.metrics.serializer_depth -= 1
+            if self.metrics.serializer_depth == 0:
+                self.metrics.serializer_time += time.perf_counter() - self.started
+
+
+class TimedRepresentationMixin:
+    """Serializer mixin feeding to_representation time into the request metrics."""
+    def to_representation(self, instance):
+        with timed_serialization():
+            return super().to_representation(instance)
+
+
+def add_compression_time(seconds):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.compression_time += seconds
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures each request's wall time, database queries and time, serializer
+    time, compression time and response size as sent. Emits them as a
+    Server-Timing header and a JSON log line on the ManagerApp.requests
+    logger, and feeds per-URL-name histograms served by the metrics endpoint.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        wall = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.url_name if match is not None and match.url_name else None
+        record = {
+            'url_name': url_name,
+            'method': request.method,
+            'status': response.status_code,
+            'wall_ms': round(wall * 1000, 3),
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 3),
+            'serializer_ms': round(metrics.serializer_time * 1000, 3),
+            'compress_ms': round(metrics.compression_time * 1000, 3),
+            'encoding': response.get('Content-Encoding'),
+            'bytes': None if response.streaming else len(response.content),
+        }
+        response['Server-Timing'] = ', '.join([
+            'db;dur=%.3f;desc="%d queries"' % (record['db_ms'], metrics.queries),
+            'serializer;dur=%.3f' % record['serializer_ms'],
+            'compress;dur=%.3f' % record['compress_ms'],
+            'total;dur=%.3f' % record['wall_ms'],
+        ])
+        logger.info(json.dumps(record))
+        if url_name is not None:
+            histograms.add(url_name, record)
+        return response
@@ -0,0 +1,177 @@
+import csv
+import json
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+
+from . import models
+
+
+LEDGER_COLUMNS = ['kind', 'id', 'parent_id', 'name', 'amount', 'date_created', 'date_modified']
+
+# (kind, model, parent column, name column, amount column) for every table that
+# makes up a user's ledger, in export order.
+LEDGER_SOURCES = [
+    ('time_budget', models.TimeBudgetModel, None, 'time_budget_name', None),
+    ('money_budget', models.MoneyBudgetModel, None, 'money_budget_name', None),
+    ('income', models.ModelIncome, 'model_budget_id', 'model_income_name', 'amount'),
+    ('expense', models.ModelExpense, 'model_budget_id', 'model_expense_name', 'amount'),
+    ('time_slot', models.TimeSlotModel, 'model_time_budget_id', 'time_slot_name', None),
+]
+
+
+def iter_ledger_rows(user, chunk_size=2000):
+    """
+    Yield every ledger row of `user` as a tuple in LEDGER_COLUMNS order.
+
+    Rows come from values_list() iterators, so only `chunk_size` rows are held
+    in memory at a time and no model instances are built.
+    """
+    for kind, model, parent, name, amount in LEDGER_SOURCES:
+        columns = ['id', parent or 'id', name, amount or 'id', 'date_created', 'date_modified']
+        queryset = model.objects.filter(owner=user).order_by('date_created', 'id').values_list(*columns)
+        for pk, parent_id, row_name, row_amount, date_created, date_modified in queryset.iterator(chunk_size=chunk_size):
+            yield (
+                kind,
+                pk,
+                parent_id if parent else None,
+                row_name,
+                str(row_amount) if amount else None,
+                date_created.isoformat(),
+                date_modified.isoformat(),
+            )
+
+
+class Echo:
+    """A file-like object whose write() hands the line back to the caller."""
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(LEDGER_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(LEDGER_COLUMNS, row))) + '\n'
+
+
+RENDERERS = {
+    'csv': (render_csv, 'text/csv'),
+    'ndjson': (render_ndjson, 'application/x-ndjson'),
+}
+
+
+# kind -> (model, name column, budget total it feeds) for rows import_ledger accepts.
+IMPORT_KINDS = {
+    'income': (models.ModelIncome, 'model_income_name', 'income_total'),
+    'expense': (models.ModelExpense, 'model_expense_name', 'expense_total'),
+}
+
+
+class ImportReport:
+    max_reported_errors = 1000
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.monotonic()
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < self.max_reported_errors:
+            self.errors.append({'line': line, 'error': message})
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'failed': self.failed,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'errors': self.errors,
+        }
+
+
+def build_entry(row, user, budget_ids):
+    """Validate one CSV row against the model constraints and return an unsaved instance."""
+    if row.get('kind') not in IMPORT_KINDS:
+        raise ValidationError('kind must be one of: %s.' % ', '.join(sorted(IMPORT_KINDS)))
+    model, name_field, _ = IMPORT_KINDS[row['kind']]
+    try:
+        model_budget_id = int(row.get('parent_id') or '')
+    except ValueError:
+        raise ValidationError('parent_id must be a money budget id.')
+    if model_budget_id not in budget_ids:
+        raise ValidationError('Money budget %d does not exist.' % model_budget_id)
+    name = model._meta.get_field(name_field).clean(row.get('name') or '', None)
+    amount = model._meta.get_field('amount').clean(row.get('amount') or '0', None)
+    return model(**{name_field: name, 'amount': amount, 'model_budget_id': model_budget_id, 'owner': user})
+
+
+def import_ledger_rows(user, lines, batch_size=1000, report=None):
+    """
+    Import income/expense rows from CSV `lines` (in the export's column layout)
+    for `user`, writing `batch_size` rows per bulk_create.
+
+    Lines are consumed lazily, so the file is never held in memory. Invalid
+    rows are recorded in the report and skipped; each batch is written inside
+    its own atomic block, so a failing batch only loses its own rows. A file
+    that stops decoding (not UTF-8) or parsing as CSV ends the import there,
+    with an error for the line it stopped at; the rows before it are kept.
+    """
+    report = report or ImportReport()
+    budget_ids = set(models.MoneyBudgetModel.objects.filter(owner=user).values_list('pk', flat=True))
+    batch = []
+    reader = csv.DictReader(lines)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except (UnicodeDecodeError, csv.Error) as error:
+            report.add_error(reader.line_num + 1, 'File could not be read past this line (%s); the import stopped here.' % error)
+            break
+        report.rows += 1
+        line = report.rows + 1
+        try:
+            batch.append((line, build_entry(row, user, budget_ids)))
+        except ValidationError as error:
+            report.add_error(line, ' '.join(error.messages))
+        if len(batch) >= batch_size:
+            write_batch(batch, report)
+            batch = []
+    if batch:
+        write_batch(batch, report)
+    return report
+
+
+def write_batch(batch, report):
+    try:
+        with transaction.atomic():
+            for kind, (model, _, total_field) in IMPORT_KINDS.items():
+                entries = [entry for _, entry in batch if isinstance(entry, model)]
+                if entries:
+                    model.objects.bulk_create(entries)
+                    models.MoneyBudgetModel.objects.apply_changes(
+                        total_field, [(entry.model_budget_id, entry.amount, 1) for entry in entries])
+    except DatabaseError as error:
+        for line, _ in batch:
+            report.add_error(line, 'Batch could not be written: %s' % error)
+    else:
+        report.created += len(batch)
@@ -0,0 +1,77 @@
+import json
+from collections import OrderedDict
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from ManagerApp.benchmarks import BENCHMARKS
+
+
+COMPARED_KEYS = ('per_second', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_call')
+
+
+def flatten(results, prefix=''):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, '%s%s.' % (prefix, key))
+        elif key in COMPARED_KEYS and isinstance(value, (int, float)):
+            yield prefix + key, value
+
+
+def compare(results, baseline):
+    """Per-metric change against a previous report's benchmarks, in percent."""
+    previous = dict(flatten(baseline))
+    changes = OrderedDict()
+    for key, value in flatten(results):
+        if previous.get(key):
+            changes[key] = OrderedDict([
+                ('baseline', previous[key]), ('current', value),
+                ('change_pct', round((value - previous[key]) / previous[key] * 100, 1)),
+            ])
+    return changes
+
+
+class Command(BaseCommand):
+    help = 'Run the API benchmarks against a throwaway test database and print a JSON report.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Benchmarks to run; all when omitted. Available: %s.' % ', '.join(BENCHMARKS))
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+        parser.add_argument('--baseline', help='A report from an earlier run (e.g. the previous commit) to compare against.')
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(BENCHMARKS)
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError('Unknown benchmarks: %s' % ', '.join(sorted(unknown)))
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)['benchmarks']
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = OrderedDict((name, BENCHMARKS[name](options['iterations'])) for name in names)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = OrderedDict([
+            ('django', django.get_version()),
+            ('database', connection.vendor),
+            ('iterations', options['iterations']),
+            ('benchmarks', results),
+        ])
+        if baseline is not None:
+            report['changes'] = compare(results, baseline)
+        report = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        else:
+            self.stdout.write(report)
@@ -0,0 +1,34 @@
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from ManagerApp import ledger
+
+
+class Command(BaseCommand):
+    help = "Stream each user's ledger to <output-dir>/<username>.<format>."
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Users to export; all users when omitted.')
+        parser.add_argument('--format', choices=sorted(ledger.RENDERERS), default='csv')
+        parser.add_argument('--output-dir', default='.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the database per round trip.')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError('Unknown users: %s' % ', '.join(sorted(missing)))
+
+        render, _ = ledger.RENDERERS[options['format']]
+        os.makedirs(options['output_dir'], exist_ok=True)
+        exported = 0
+        for user in users.only('pk', 'username').iterator(chunk_size=options['chunk_size']):
+            path = os.path.join(options['output_dir'], '%s.%s' % (user.username, options['format']))
+            with open(path, 'w', newline='') as output:
+                output.writelines(render(ledger.iter_ledger_rows(user, chunk_size=options['chunk_size'])))
+            exported += 1
+        self.stdout.write(self.style.SUCCESS('Exported %d ledgers to %s.' % (exported, options['output_dir'])))
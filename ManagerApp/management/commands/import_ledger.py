@@ -0,0 +1,31 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from ManagerApp import ledger, response_cache
+
+
+class Command(BaseCommand):
+    help = 'Import income/expense rows for a user from a CSV file laid out like export_ledger output.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help='CSV file with kind, parent_id, name and amount columns.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per bulk_create.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('Unknown user: %s' % options['username'])
+
+        with open(options['path'], newline='', encoding='utf-8') as lines:
+            report = ledger.import_ledger_rows(user, lines, batch_size=options['batch_size'])
+        response_cache.bump_generation(user.pk)
+
+        for error in report.errors:
+            self.stderr.write('line %(line)d: %(error)s' % error)
+        self.stdout.write(json.dumps(report.as_dict(), indent=2) if options['verbosity'] > 1 else
+                          'Imported %d of %d rows (%d failed) in %.2fs, %.0f rows/s.' % (
+                              report.created, report.rows, report.failed, report.elapsed, report.rows_per_second))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from ManagerApp.authentication import token_ttl
+
+
+class Command(BaseCommand):
+    help = 'Delete tokens older than TOKEN_TTL in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tokens deleted per statement.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - token_ttl()
+        expired = Token.objects.filter(created__lte=cutoff).order_by('created')
+        purged = 0
+        while True:
+            keys = list(expired.values_list('key', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            purged += Token.objects.filter(key__in=keys).delete()[0]
+        self.stdout.write(self.style.SUCCESS('Purged %d expired tokens.' % purged))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ManagerApp import models, response_cache
+
+
+TOTAL_FIELDS = ('income_total', 'expense_total', 'entry_count')
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialised income/expense totals on money budgets and repair any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report drifted budgets; exit with an error if any are found.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of budgets read and written per batch.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = models.MoneyBudgetModel.objects.with_computed_totals().only('id', *TOTAL_FIELDS).order_by('id')
+        checked = 0
+        drifted = []
+
+        for budget in queryset.iterator(chunk_size=batch_size):
+            checked += 1
+            if any(getattr(budget, field) != getattr(budget, 'computed_' + field) for field in TOTAL_FIELDS):
+                drifted.append(budget.pk)
+
+        if options['check']:
+            if drifted:
+                raise CommandError('%d of %d money budgets have drifted totals: %s' % (
+                    len(drifted), checked, ', '.join(map(str, drifted))))
+            self.stdout.write('All %d money budgets have consistent totals.' % checked)
+            return
+
+        # The totals read above may be stale by now, so each batch of drifted
+        # budgets is locked and recomputed in a single UPDATE: a write that
+        # adjusts one of them meanwhile either commits before the lock is
+        # granted and is counted, or adds its adjustment on top afterwards.
+        owners = set()
+        for start in range(0, len(drifted), batch_size):
+            with transaction.atomic():
+                batch = models.MoneyBudgetModel.objects.filter(pk__in=drifted[start:start + batch_size])
+                owners.update(batch.select_for_update().values_list('owner', flat=True))
+                batch.recompute_totals()
+        for owner_id in owners:
+            response_cache.bump_generation(owner_id)
+        self.stdout.write(self.style.SUCCESS('Checked %d money budgets, repaired %d.' % (checked, len(drifted))))
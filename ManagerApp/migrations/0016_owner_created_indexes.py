@@ -0,0 +1,33 @@
+# Generated by Django 3.0.6 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ManagerApp', '0015_timeslotmodel'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='modelexpense',
+            index=models.Index(fields=['owner', 'date_created', 'id'], name='modelexpense_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='modelincome',
+            index=models.Index(fields=['owner', 'date_created', 'id'], name='modelincome_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moneybudgetmodel',
+            index=models.Index(fields=['owner', 'date_created', 'id'], name='moneybudget_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timebudgetmodel',
+            index=models.Index(fields=['owner', 'date_created', 'id'], name='timebudget_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeslotmodel',
+            index=models.Index(fields=['owner', 'date_created', 'id'], name='timeslot_owner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.0.6 on 2026-10-18 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ManagerApp', '0016_owner_created_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelexpense',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Amount'),
+        ),
+        migrations.AddField(
+            model_name='modelincome',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Amount'),
+        ),
+    ]
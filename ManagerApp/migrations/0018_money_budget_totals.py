@@ -0,0 +1,47 @@
+# Generated by Django 3.0.6 on 2026-10-18 09:59
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_totals(apps, schema_editor):
+    MoneyBudgetModel = apps.get_model('ManagerApp', 'MoneyBudgetModel')
+
+    def aggregate(model_name, aggregate, output_field):
+        model = apps.get_model('ManagerApp', model_name)
+        queryset = model.objects.filter(model_budget=OuterRef('pk')).order_by().values('model_budget')
+        return Coalesce(Subquery(queryset.annotate(value=aggregate).values('value'), output_field=output_field), Value(0))
+
+    amount = DecimalField(max_digits=14, decimal_places=2)
+    MoneyBudgetModel.objects.update(
+        income_total=aggregate('ModelIncome', Sum('amount'), amount),
+        expense_total=aggregate('ModelExpense', Sum('amount'), amount),
+        entry_count=aggregate('ModelIncome', Count('id'), IntegerField()) + aggregate('ModelExpense', Count('id'), IntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ManagerApp', '0017_income_expense_amount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moneybudgetmodel',
+            name='entry_count',
+            field=models.IntegerField(default=0, verbose_name='Entry Count'),
+        ),
+        migrations.AddField(
+            model_name='moneybudgetmodel',
+            name='expense_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Expense Total'),
+        ),
+        migrations.AddField(
+            model_name='moneybudgetmodel',
+            name='income_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Income Total'),
+        ),
+        migrations.RunPython(populate_totals, migrations.RunPython.noop),
+    ]
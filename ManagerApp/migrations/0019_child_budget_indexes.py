@@ -0,0 +1,68 @@
+# Generated by Django 3.0.6 on 2026-10-18 10:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ManagerApp', '0018_money_budget_totals'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='modelexpense',
+            name='model_budget',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='model_expenses', to='ManagerApp.MoneyBudgetModel', verbose_name='Budget Model'),
+        ),
+        migrations.AlterField(
+            model_name='modelexpense',
+            name='owner',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='model_expense', to=settings.AUTH_USER_MODEL, verbose_name='Model Expense Owner'),
+        ),
+        migrations.AlterField(
+            model_name='modelincome',
+            name='model_budget',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='model_incomes', to='ManagerApp.MoneyBudgetModel', verbose_name='Budget Model'),
+        ),
+        migrations.AlterField(
+            model_name='modelincome',
+            name='owner',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='model_income', to=settings.AUTH_USER_MODEL, verbose_name='Model Income Owner'),
+        ),
+        migrations.AlterField(
+            model_name='moneybudgetmodel',
+            name='owner',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='model_budget', to=settings.AUTH_USER_MODEL, verbose_name='Money Budget Owner'),
+        ),
+        migrations.AlterField(
+            model_name='timebudgetmodel',
+            name='owner',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='timebudget', to=settings.AUTH_USER_MODEL, verbose_name='Time Budget Owner'),
+        ),
+        migrations.AlterField(
+            model_name='timeslotmodel',
+            name='model_time_budget',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='time_slot_models', to='ManagerApp.TimeBudgetModel', verbose_name='Time Slot Model'),
+        ),
+        migrations.AlterField(
+            model_name='timeslotmodel',
+            name='owner',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='time_slot_model', to=settings.AUTH_USER_MODEL, verbose_name='Time Slot Model Owner'),
+        ),
+        migrations.AddIndex(
+            model_name='modelexpense',
+            index=models.Index(fields=['model_budget', 'date_created'], name='expense_budget_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='modelincome',
+            index=models.Index(fields=['model_budget', 'date_created'], name='income_budget_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeslotmodel',
+            index=models.Index(fields=['model_time_budget', 'date_created'], name='timeslot_budget_created_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.0.6 on 2026-10-18 10:24
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ManagerApp', '0019_child_budget_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeslotmodel',
+            name='end_time',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='End Time'),
+        ),
+        migrations.AddField(
+            model_name='timeslotmodel',
+            name='start_time',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Start Time'),
+        ),
+        migrations.AddIndex(
+            model_name='timeslotmodel',
+            index=models.Index(fields=['model_time_budget', 'start_time'], name='timeslot_budget_start_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timeslotmodel',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('end_time__isnull', True), ('start_time__isnull', True)), models.Q(('end_time__gt', django.db.models.expressions.F('start_time')), ('end_time__isnull', False), ('start_time__isnull', False)), _connector='OR'), name='timeslot_start_before_end'),
+        ),
+    ]
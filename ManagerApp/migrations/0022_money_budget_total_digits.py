@@ -0,0 +1,23 @@
+# Generated by Django 3.0.6 on 2026-10-18 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ManagerApp', '0021_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='moneybudgetmodel',
+            name='expense_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=22, verbose_name='Expense Total'),
+        ),
+        migrations.AlterField(
+            model_name='moneybudgetmodel',
+            name='income_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=22, verbose_name='Income Total'),
+        ),
+    ]
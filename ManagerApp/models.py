@@ -1,6 +1,11 @@
+from collections import defaultdict
+
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Count, DateTimeField, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext as _
 
 class BaseModel(models.Model):
@@ -12,11 +17,14 @@ class BaseModel(models.Model):
 
 class TimeBudgetModel(BaseModel):
     time_budget_name = models.CharField(_("Time Budget Name"), max_length=50)
-    owner = models.ForeignKey(User, related_name='timebudget', verbose_name=_("Time Budget Owner"), on_delete=models.CASCADE)
+    owner = models.ForeignKey(User, related_name='timebudget', verbose_name=_("Time Budget Owner"), on_delete=models.CASCADE, db_index=False)
     class Meta:
         verbose_name = _("Time Budget")
         verbose_name_plural = _("Time Budgets")
         ordering = ['date_created']
+        indexes = [
+            models.Index(fields=['owner', 'date_created', 'id'], name='timebudget_owner_created_idx'),
+        ]
 
     def __str__(self):
         return self.time_budget_name
@@ -25,13 +33,87 @@ class TimeBudgetModel(BaseModel):
         return reverse("time_budget_detail", kwargs={"pk": self.pk})
 
 
+# Digits of the income/expense totals: ten more than an amount has, so even
+# as many maximal amounts as entry_count can hold (2**31) cannot overflow them.
+TOTAL_DIGITS = 22
+
+
+def total_output_field():
+    """Output field for sums of amounts; the amount column itself is too narrow for them."""
+    return DecimalField(max_digits=TOTAL_DIGITS, decimal_places=2)
+
+
+def _child_aggregate(model, aggregate, output_field):
+    queryset = model.objects.filter(model_budget=OuterRef('pk')).order_by().values('model_budget')
+    return Coalesce(Subquery(queryset.annotate(value=aggregate).values('value'), output_field=output_field), Value(0))
+
+
+def _computed_totals():
+    """The materialised totals as expressions over the incomes/expenses."""
+    return {
+        'income_total': _child_aggregate(ModelIncome, Sum('amount'), total_output_field()),
+        'expense_total': _child_aggregate(ModelExpense, Sum('amount'), total_output_field()),
+        'entry_count': (
+            _child_aggregate(ModelIncome, Count('id'), models.IntegerField())
+            + _child_aggregate(ModelExpense, Count('id'), models.IntegerField())
+        ),
+    }
+
+
+class MoneyBudgetQuerySet(models.QuerySet):
+    def with_computed_totals(self):
+        """Annotate totals recomputed from the incomes/expenses, in one SQL statement."""
+        return self.annotate(**{'computed_' + field: value for field, value in _computed_totals().items()})
+
+    def recompute_totals(self):
+        """
+        Overwrite the materialised totals with ones recomputed from the
+        incomes/expenses, reading and writing in one UPDATE.
+        """
+        return self.update(date_modified=timezone.now(), **_computed_totals())
+
+    def with_balance(self):
+        return self.annotate(balance=F('income_total') - F('expense_total'))
+
+    def adjust_totals(self, income_total=0, expense_total=0, entry_count=0):
+        """Shift the materialised totals in place with F-expressions; call inside the writing transaction."""
+        return self.update(
+            income_total=F('income_total') + income_total,
+            expense_total=F('expense_total') + expense_total,
+            entry_count=F('entry_count') + entry_count,
+            date_modified=timezone.now(),
+        )
+
+    def apply_changes(self, total_field, changes):
+        """
+        Apply (model_budget_id, amount, entries) changes to `total_field`, one
+        UPDATE per budget touched. Budgets whose totals net to zero are still
+        updated so their date_modified reflects the change to their entries.
+        """
+        totals = defaultdict(lambda: [0, 0])
+        for model_budget_id, amount, entries in changes:
+            totals[model_budget_id][0] += amount
+            totals[model_budget_id][1] += entries
+        for model_budget_id, (amount, entries) in totals.items():
+            self.filter(pk=model_budget_id).adjust_totals(**{total_field: amount, 'entry_count': entries})
+
+
 class MoneyBudgetModel(BaseModel):
     money_budget_name = models.CharField(_("Money Budget Name"), max_length=50)
-    owner = models.ForeignKey(User, related_name='model_budget', verbose_name=_("Money Budget Owner"), on_delete=models.CASCADE)
+    owner = models.ForeignKey(User, related_name='model_budget', verbose_name=_("Money Budget Owner"), on_delete=models.CASCADE, db_index=False)
+    income_total = models.DecimalField(_("Income Total"), max_digits=TOTAL_DIGITS, decimal_places=2, default=0)
+    expense_total = models.DecimalField(_("Expense Total"), max_digits=TOTAL_DIGITS, decimal_places=2, default=0)
+    entry_count = models.IntegerField(_("Entry Count"), default=0)
+
+    objects = MoneyBudgetQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Money Budget")
         verbose_name_plural = _("Money Budgets")
         ordering = ['date_created']
+        indexes = [
+            models.Index(fields=['owner', 'date_created', 'id'], name='moneybudget_owner_created_idx'),
+        ]
 
     def __str__(self):
         return self.money_budget_name
@@ -42,13 +124,18 @@ class MoneyBudgetModel(BaseModel):
 
 class ModelIncome(BaseModel):
     model_income_name = models.CharField(_("Model Income Name"), max_length=50)
-    model_budget = models.ForeignKey("MoneyBudgetModel", related_name='model_incomes', verbose_name=_("Budget Model"), on_delete=models.CASCADE)
-    owner = models.ForeignKey(User, related_name='model_income', verbose_name=_("Model Income Owner"), on_delete=models.CASCADE)
+    amount = models.DecimalField(_("Amount"), max_digits=12, decimal_places=2, default=0)
+    model_budget = models.ForeignKey("MoneyBudgetModel", related_name='model_incomes', verbose_name=_("Budget Model"), on_delete=models.CASCADE, db_index=False)
+    owner = models.ForeignKey(User, related_name='model_income', verbose_name=_("Model Income Owner"), on_delete=models.CASCADE, db_index=False)
 
     class Meta:
         verbose_name = _("Model Income")
         verbose_name_plural = _("Model Income")
         ordering = ['date_created']
+        indexes = [
+            models.Index(fields=['owner', 'date_created', 'id'], name='modelincome_owner_created_idx'),
+            models.Index(fields=['model_budget', 'date_created'], name='income_budget_created_idx'),
+        ]
 
     def __str__(self):
         return self.model_income_name
@@ -59,13 +146,18 @@ class ModelIncome(BaseModel):
 
 class ModelExpense(BaseModel):
     model_expense_name = models.CharField(_("Model Expense Name"), max_length=50)
-    model_budget = models.ForeignKey("MoneyBudgetModel", related_name='model_expenses', verbose_name=_("Budget Model"), on_delete=models.CASCADE)
-    owner = models.ForeignKey(User, related_name='model_expense', verbose_name=_("Model Expense Owner"), on_delete=models.CASCADE)
+    amount = models.DecimalField(_("Amount"), max_digits=12, decimal_places=2, default=0)
+    model_budget = models.ForeignKey("MoneyBudgetModel", related_name='model_expenses', verbose_name=_("Budget Model"), on_delete=models.CASCADE, db_index=False)
+    owner = models.ForeignKey(User, related_name='model_expense', verbose_name=_("Model Expense Owner"), on_delete=models.CASCADE, db_index=False)
 
     class Meta:
         verbose_name = _("Model Expense")
         verbose_name_plural = _("Model Expense")
         ordering = ['date_created']
+        indexes = [
+            models.Index(fields=['owner', 'date_created', 'id'], name='modelexpense_owner_created_idx'),
+            models.Index(fields=['model_budget', 'date_created'], name='expense_budget_created_idx'),
+        ]
 
     def __str__(self):
         return self.model_expense_name
@@ -74,18 +166,75 @@ class ModelExpense(BaseModel):
         return reverse("model_expense_detail", kwargs={"pk": self.pk})
 
 
+class TimeSlotQuerySet(models.QuerySet):
+    def overlapping(self, start, end):
+        """
+        Scheduled slots of a single time budget that overlap [start, end),
+        in start order.
+
+        The serializer keeps a budget's slots from overlapping, so they are
+        ordered by end_time as well as start_time and only the last slot
+        starting before `start` can reach into the range. Bounding the scan by
+        that slot's start keeps both lookups on timeslot_budget_start_idx
+        (seek, then a range of the matches) instead of every earlier slot.
+        """
+        previous = self.filter(start_time__lt=start).order_by('-start_time').values('start_time')[:1]
+        lower = Coalesce(Subquery(previous, output_field=DateTimeField()), Value(start, output_field=DateTimeField()))
+        return self.filter(start_time__gte=lower, start_time__lt=end, end_time__gt=start).order_by('start_time')
+
+
 class TimeSlotModel(BaseModel):
     time_slot_name = models.CharField(_("Time Slot Model Name"), max_length=50)
-    model_time_budget = models.ForeignKey("TimeBudgetModel", related_name='time_slot_models', verbose_name=_("Time Slot Model"), on_delete=models.CASCADE)
-    owner = models.ForeignKey(User, related_name='time_slot_model', verbose_name=_("Time Slot Model Owner"), on_delete=models.CASCADE)
+    model_time_budget = models.ForeignKey("TimeBudgetModel", related_name='time_slot_models', verbose_name=_("Time Slot Model"), on_delete=models.CASCADE, db_index=False)
+    owner = models.ForeignKey(User, related_name='time_slot_model', verbose_name=_("Time Slot Model Owner"), on_delete=models.CASCADE, db_index=False)
+    # Both null for a slot that is not scheduled yet.
+    start_time = models.DateTimeField(_("Start Time"), null=True, blank=True)
+    end_time = models.DateTimeField(_("End Time"), null=True, blank=True)
+
+    objects = TimeSlotQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("Time slot model")
         verbose_name_plural = _("Time Slot Model")
         ordering = ['date_created']
+        indexes = [
+            models.Index(fields=['owner', 'date_created', 'id'], name='timeslot_owner_created_idx'),
+            models.Index(fields=['model_time_budget', 'date_created'], name='timeslot_budget_created_idx'),
+            models.Index(fields=['model_time_budget', 'start_time'], name='timeslot_budget_start_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=Q(start_time__isnull=True, end_time__isnull=True) | Q(
+                    start_time__isnull=False, end_time__isnull=False, end_time__gt=F('start_time')),
+                name='timeslot_start_before_end'),
+        ]
 
     def __str__(self):
         return self.time_slot_name
 
     def get_absolute_url(self):
-        return reverse("time_slot_model_detail", kwargs={"pk": self.pk})
\ No newline at end of file
+        return reverse("time_slot_model_detail", kwargs={"pk": self.pk})
+
+
+class IdempotencyKey(models.Model):
+    """
+    The outcome of a create request sent with an Idempotency-Key header,
+    replayed to retries of the same request until expires_at.
+    """
+    owner = models.ForeignKey(User, related_name='idempotency_keys', on_delete=models.CASCADE, db_index=False)
+    key = models.CharField(_("Idempotency Key"), max_length=255)
+    fingerprint = models.CharField(_("Request Fingerprint"), max_length=64)
+    status_code = models.PositiveSmallIntegerField(_("Response Status"), null=True)
+    response_body = models.TextField(_("Response Body"), blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(_("Expires At"), db_index=True)
+
+    class Meta:
+        verbose_name = _("Idempotency key")
+        verbose_name_plural = _("Idempotency keys")
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'key'], name='idempotencykey_owner_key_unique'),
+        ]
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,125 @@
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from urllib import parse
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .filters import MAX_ID
+
+
+class DateCreatedCursorPagination(pagination.BasePagination):
+    """
+    Keyset pagination over (date_created, id).
+
+    Each page is fetched with a range condition on the composite
+    (owner, date_created, id) index instead of an OFFSET, so any page costs
+    the same as the first one. The cursor is an opaque base64 token holding
+    the boundary row's date_created, id and the paging direction.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 500
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[2]
+
+        if reverse:
+            queryset = queryset.order_by('-date_created', '-id')
+        else:
+            queryset = queryset.order_by('date_created', 'id')
+
+        if cursor is not None:
+            date_created, pk, _ = cursor
+            if reverse:
+                queryset = queryset.filter(Q(date_created__lt=date_created) | Q(date_created=date_created, id__lt=pk))
+            else:
+                queryset = queryset.filter(Q(date_created__gt=date_created) | Q(date_created=date_created, id__gt=pk))
+
+        results = list(queryset[:self.page_size + 1])
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_following
+        else:
+            self.has_next, self.has_previous = has_following, cursor is not None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if requested <= 0:
+            return self.page_size
+        return min(requested, self.max_page_size)
+
+    @staticmethod
+    def get_boundary(row):
+        # Model instances, or values() rows for the lean list serializers.
+        if isinstance(row, dict):
+            return row['date_created'], row['id']
+        return row.date_created, row.pk
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(*self.get_boundary(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(*self.get_boundary(self.page[0]), reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = parse.parse_qs(b64decode(encoded.encode('ascii')).decode('ascii'))
+            date_created = parse_datetime(tokens['d'][0])
+            pk = int(tokens['i'][0])
+            reverse = tokens.get('r', ['0'])[0] == '1'
+            # Both go into the query, so they must fit its columns.
+            if date_created is None or timezone.is_naive(date_created) or not 0 < pk <= MAX_ID:
+                raise ValueError
+            date_created.astimezone(timezone.utc)
+        except (KeyError, TypeError, ValueError, OverflowError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return date_created, pk, reverse
+
+    def encode_cursor(self, date_created, pk, reverse):
+        tokens = {'d': date_created.isoformat(), 'i': pk}
+        if reverse:
+            tokens['r'] = '1'
+        encoded = b64encode(parse.urlencode(tokens).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,89 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # Optional; the classes below fall back to DRF's json path.
+    orjson = None
+
+
+# Datetimes, Decimals, lazy strings etc. go through DRF's encoder, so the
+# output matches JSONRenderer's (see FastJSONRenderer for the one exception).
+ORJSON_OPTIONS = 0
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+# orjson writes these raw; JSONRenderer escapes them so the output stays valid JavaScript.
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+
+# Short keys for ?compact=1 output. A name only has to be unique within the
+# object it appears in, so the per-resource name fields all become "name".
+COMPACT_FIELD_NAMES = {
+    'model_budget': 'mb',
+    'model_time_budget': 'tb',
+    'money_budget_name': 'name',
+    'time_budget_name': 'name',
+    'model_income_name': 'name',
+    'model_expense_name': 'name',
+    'time_slot_name': 'name',
+    'model_incomes': 'incomes',
+    'model_expenses': 'expenses',
+    'time_slot_models': 'slots',
+    'amount': 'amt',
+    'start_time': 'start',
+    'end_time': 'end',
+    'date_created': 'created',
+    'date_modified': 'modified',
+}
+
+
+def compact_requested(request):
+    return request is not None and request.query_params.get('compact', '').lower() in ('1', 'true')
+
+
+def compact_keys(data):
+    """`data` with dict keys shortened through COMPACT_FIELD_NAMES, at any depth."""
+    if isinstance(data, dict):
+        return {COMPACT_FIELD_NAMES.get(key, key): compact_keys(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [compact_keys(item) for item in data]
+    return data
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed. Indented, ASCII-only
+    (UNICODE_JSON off) and spaced (COMPACT_JSON off) output is left to
+    JSONRenderer. With ?compact=1 the field names are shortened through
+    COMPACT_FIELD_NAMES.
+
+    U+2028/U+2029 are escaped as JSONRenderer does. One difference remains:
+    orjson writes NaN and Infinity floats as null where JSONRenderer raises.
+    No serializer here emits floats (amounts are Decimals, rendered as
+    strings), so the strict check is not worth a pass over every response.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if compact_requested((renderer_context or {}).get('request')):
+            data = compact_keys(data)
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        rendered = orjson.dumps(data, default=encoders.JSONEncoder().default, option=ORJSON_OPTIONS)
+        return rendered.replace(LINE_SEPARATOR, b'\\u2028').replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser backed by orjson when it is installed; request bodies must be UTF-8."""
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % exc)
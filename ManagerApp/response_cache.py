@@ -0,0 +1,116 @@
+import hashlib
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from rest_framework import permissions, response
+
+
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+
+def list_cache():
+    return caches[getattr(settings, 'LIST_CACHE_ALIAS', 'default')]
+
+
+def list_cache_timeout():
+    return getattr(settings, 'LIST_CACHE_TIMEOUT', 60)
+
+
+def generation_key(user_pk):
+    return 'list-cache-generation:%s' % user_pk
+
+
+def new_generation():
+    # Random rather than 1, so a generation evicted from the cache does not
+    # start over at a number earlier keys and list ETags were built from.
+    return random.getrandbits(48)
+
+
+def get_generation(user_pk):
+    cache = list_cache()
+    generation = cache.get(generation_key(user_pk))
+    if generation is None:
+        cache.add(generation_key(user_pk), new_generation(), None)
+        generation = cache.get(generation_key(user_pk))
+    return generation
+
+
+def bump_generation(user_pk):
+    """Invalidate every cached list response and list ETag of the user."""
+    cache = list_cache()
+    try:
+        cache.incr(generation_key(user_pk))
+    except ValueError:
+        cache.add(generation_key(user_pk), new_generation(), None)
+
+
+def increment(name):
+    cache = list_cache()
+    key = 'list-cache-stats:%s' % name
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def stats():
+    cache = list_cache()
+    hits = cache.get('list-cache-stats:hits', 0)
+    misses = cache.get('list-cache-stats:misses', 0)
+    return {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else None}
+
+
+class InvalidateListCacheMixin:
+    """
+    Bumps the user's list cache generation after every successful write
+    handled by the view. This runs once the response is built, i.e. after the
+    write has committed, so a concurrent reader cannot cache pre-write rows
+    under the new generation.
+    """
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in permissions.SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+            bump_generation(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class CachedListMixin(InvalidateListCacheMixin):
+    """
+    Caches list responses per user, URL (including query params) and
+    renderer in Django's cache for LIST_CACHE_TIMEOUT seconds (0 disables).
+    Keys embed the user's generation counter, so any write through the views
+    makes older entries unreachable.
+    """
+    def get_list_cache_key(self, request):
+        path = hashlib.md5(('%s:%s' % (request.get_full_path(), request.accepted_renderer.format)).encode()).hexdigest()
+        return 'list-cache:%s:%s:%s' % (request.user.pk, get_generation(request.user.pk), path)
+
+    def list(self, request, *args, **kwargs):
+        timeout = list_cache_timeout()
+        if not timeout:
+            return super().list(request, *args, **kwargs)
+
+        cache = list_cache()
+        key = self.get_list_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            increment('hits')
+            data, headers = cached
+            not_modified = get_conditional_response(request, etag=headers.get('ETag'))
+            if not_modified is None:
+                not_modified = response.Response(data)
+            for header, value in headers.items():
+                not_modified[header] = value
+            not_modified['X-Cache'] = 'HIT'
+            return not_modified
+
+        increment('misses')
+        list_response = super().list(request, *args, **kwargs)
+        if list_response.status_code == 200:
+            headers = {header: list_response[header] for header in CACHED_HEADERS if list_response.has_header(header)}
+            cache.set(key, (list_response.data, headers), timeout)
+        list_response['X-Cache'] = 'MISS'
+        return list_response
+
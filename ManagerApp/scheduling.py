@@ -0,0 +1,159 @@
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from . import models
+
+
+def find_conflict(intervals):
+    """
+    First overlap that (time_budget_id, start, end, pk) intervals about to be
+    saved would cause, as a (new interval, other interval) pair, or None.
+    `pk` is the slot being moved (None for a new slot) and is ignored among
+    the stored slots. Stored slots are fetched with one overlapping() query
+    per budget, covering the span of that budget's new intervals, then the
+    lot is sorted and checked in one pass.
+    """
+    by_budget = defaultdict(list)
+    for budget_id, start, end, pk in intervals:
+        by_budget[budget_id].append((start, end, pk, True))
+    for budget_id, new in by_budget.items():
+        moved = [pk for _, _, pk, _ in new if pk is not None]
+        stored = models.TimeSlotModel.objects.filter(model_time_budget_id=budget_id).overlapping(
+            min(start for start, _, _, _ in new), max(end for _, end, _, _ in new)).exclude(pk__in=moved)
+        combined = sorted(new + [(start, end, pk, False) for start, end, pk in stored.values_list('start_time', 'end_time', 'pk')],
+                          key=lambda interval: interval[:2])
+        latest = None
+        for interval in combined:
+            if latest is not None and interval[0] < latest[1] and (interval[3] or latest[3]):
+                return (interval, latest) if interval[3] else (latest, interval)
+            if latest is None or interval[1] > latest[1]:
+                latest = interval
+    return None
+
+
+def free_intervals(busy, start, end):
+    """The gaps in [start, end) between sorted, non-overlapping (start, end) busy intervals."""
+    free = []
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_start > cursor:
+            free.append((cursor, min(busy_start, end)))
+        cursor = max(cursor, busy_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        free.append((cursor, end))
+    return free
+
+
+def merge_intervals(intervals):
+    """Sweep (start, end) intervals sorted by start into disjoint, sorted busy intervals; touching ones are joined."""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(interval) for interval in merged]
+
+
+def busy_cache():
+    return caches[getattr(settings, 'BUSY_CACHE_ALIAS', 'default')]
+
+
+def version_key(time_budget_id):
+    return 'busy-version:%s' % time_budget_id
+
+
+def bump_versions(time_budget_ids):
+    cache = busy_cache()
+    for time_budget_id in time_budget_ids:
+        try:
+            cache.incr(version_key(time_budget_id))
+        except ValueError:
+            cache.add(version_key(time_budget_id), 2, None)
+
+
+def invalidate_busy(time_budget_ids):
+    """
+    Drop the cached busy lists of the time budgets, now and again once the
+    surrounding transaction commits, so a reader that loaded the slots just
+    before the commit cannot leave a stale list under the current version.
+    """
+    time_budget_ids = set(time_budget_ids) - {None}
+    if time_budget_ids:
+        bump_versions(time_budget_ids)
+        transaction.on_commit(lambda: bump_versions(time_budget_ids))
+
+
+def budget_busy(time_budget_ids):
+    """
+    Merged busy intervals of each time budget as {id: (starts, ends)}, two
+    sorted arrays of POSIX timestamps for bisecting (arrays pickle as raw
+    bytes, so large calendars come out of the cache quickly). Served from the
+    cache for BUSY_CACHE_TIMEOUT seconds; the budgets that miss are loaded
+    with one query on timeslot_budget_start_idx.
+    """
+    cache = busy_cache()
+    versions = cache.get_many([version_key(time_budget_id) for time_budget_id in time_budget_ids])
+    keys = {}
+    for time_budget_id in time_budget_ids:
+        if version_key(time_budget_id) not in versions:
+            cache.add(version_key(time_budget_id), 1, None)
+        keys[time_budget_id] = 'busy:%s:%s' % (time_budget_id, versions.get(version_key(time_budget_id), 1))
+    cached = cache.get_many(list(keys.values()))
+    busy = {time_budget_id: cached[key] for time_budget_id, key in keys.items() if key in cached}
+
+    missing = [time_budget_id for time_budget_id in time_budget_ids if time_budget_id not in busy]
+    if missing:
+        slots = defaultdict(list)
+        rows = models.TimeSlotModel.objects.filter(model_time_budget_id__in=missing, start_time__isnull=False).order_by(
+            'model_time_budget_id', 'start_time').values_list('model_time_budget_id', 'start_time', 'end_time')
+        for time_budget_id, start, end in rows:
+            slots[time_budget_id].append((start, end))
+        loaded = {}
+        for time_budget_id in missing:
+            merged = merge_intervals(slots[time_budget_id])
+            busy[time_budget_id] = loaded[keys[time_budget_id]] = (
+                array('d', (start.timestamp() for start, _ in merged)), array('d', (end.timestamp() for _, end in merged)))
+        cache.set_many(loaded, getattr(settings, 'BUSY_CACHE_TIMEOUT', 300))
+    return busy
+
+
+def from_timestamp(value):
+    return datetime.fromtimestamp(value, timezone.utc)
+
+
+def busy_between(time_budget_ids, start, end):
+    """
+    Busy intervals of all the time budgets together, clipped to [start, end).
+    Each budget's list is narrowed with bisect, then the sorted lists are
+    k-way merged and swept into one.
+    """
+    clipped = []
+    for starts, ends in budget_busy(time_budget_ids).values():
+        first, last = bisect_right(ends, start.timestamp()), bisect_left(starts, end.timestamp())
+        clipped.append(zip(starts[first:last], ends[first:last]))
+    return [(max(from_timestamp(busy_start), start), min(from_timestamp(busy_end), end))
+            for busy_start, busy_end in merge_intervals(heapq.merge(*clipped))]
+
+
+def free_windows(busy, start, end, duration, count):
+    """Up to `count` back-to-back windows of `duration` in the gaps of [start, end), earliest first."""
+    windows = []
+    for free_start, free_end in free_intervals(busy, start, end):
+        # Compared as a difference: free_start + duration may not be a valid datetime.
+        while free_end - free_start >= duration and len(windows) < count:
+            windows.append((free_start, free_start + duration))
+            free_start += duration
+        if len(windows) == count:
+            break
+    return windows
@@ -2,10 +2,13 @@ import re
 from rest_framework.exceptions import ValidationError
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from . import models
+from django.db import connections, router
+from django.utils import timezone
+from . import hashers, models, scheduling
+from .instrumentation import TimedRepresentationMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['username', 'email', 'password']
@@ -22,45 +25,326 @@ class UserSerializer(serializers.ModelSerializer):
         password = validated_data.get('password', None)
 
         if username and email and password:
-            user = User(username=username, email=email)
-            user.set_password(password)
+            user = User(username=username, email=email, password=hashers.make_password(password))
             user.save()
             return user
         raise(serializers.ValidationError('Please provide username, email, password and password confirmation'))
 
 
-class TimeBudgetModelSerializer(serializers.ModelSerializer):
+class TimeBudgetModelSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     owner = serializers.ReadOnlyField(source='owner.username')
     class Meta:
         model = models.TimeBudgetModel
         fields = ['owner', 'time_budget_name']
 
-class ModelBudgetForeignKey(serializers.PrimaryKeyRelatedField):
+class OwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Accepts only objects owned by the requesting user. A list serializer can
+    prime the field with every referenced pk so a batch is checked with one
+    IN query instead of one lookup per row.
+    """
+    owned = None
+
+    def prime(self, pks):
+        pks = [pk for pk in pks if isinstance(pk, int) or (isinstance(pk, str) and pk.isdigit())]
+        self.owned = self.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        if self.owned is None:
+            return super().to_internal_value(data)
+        try:
+            return self.owned[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class ModelBudgetForeignKey(OwnedPrimaryKeyRelatedField):
     def get_queryset(self):
         return models.MoneyBudgetModel.objects.filter(owner=self.context['request'].user)
 
-class MoneyBudgetModelSerializer(serializers.ModelSerializer):
+
+class TimeBudgetForeignKey(OwnedPrimaryKeyRelatedField):
+    def get_queryset(self):
+        return models.TimeBudgetModel.objects.filter(owner=self.context['request'].user)
+
+
+class BulkListSerializer(TimedRepresentationMixin, serializers.ListSerializer):
+    """Validates a JSON array of rows and persists it with bulk_create/bulk_update."""
+    batch_size = 500
+
+    def validate(self, attrs):
+        # Row-level checks that depend on the other rows of the batch.
+        validate_batch = getattr(self.child, 'validate_batch', None)
+        if validate_batch is not None:
+            validate_batch(attrs, self.instance)
+        return attrs
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            for field in self.child.fields.values():
+                if isinstance(field, OwnedPrimaryKeyRelatedField) and not field.read_only:
+                    field.prime({row.get(field.field_name) for row in data if isinstance(row, dict)} - {None})
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        instances = [model(**attrs) for attrs in validated_data]
+        connection = connections[router.db_for_write(model)]
+        if connection.features.can_return_rows_from_bulk_insert:
+            return model.objects.bulk_create(instances, batch_size=self.batch_size)
+        if connection.vendor == 'sqlite' and connection.in_atomic_block:
+            # SQLite's bulk_create leaves the pks unset. It lets one
+            # transaction write at a time, so the newest rows are these ones,
+            # numbered in insertion order.
+            model.objects.bulk_create(instances, batch_size=self.batch_size)
+            pks = list(model.objects.order_by('-pk').values_list('pk', flat=True)[:len(instances)])
+            for instance, pk in zip(instances, reversed(pks)):
+                instance.pk = pk
+            return instances
+        for instance in instances:
+            instance.save(force_insert=True)
+        return instances
+
+    def update(self, instances, validated_data):
+        fields = set()
+        now = timezone.now()
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+            instance.date_modified = now
+            fields.update(attrs)
+        if fields:
+            self.child.Meta.model.objects.bulk_update(instances, fields | {'date_modified'}, batch_size=self.batch_size)
+        return instances
+
+class TimeSlotListSerializer(BulkListSerializer):
+    """BulkListSerializer that also drops the busy lists of the time budgets a batch touches; bulk writes send no signals."""
+    def create(self, validated_data):
+        instances = super().create(validated_data)
+        scheduling.invalidate_busy(instance.model_time_budget_id for instance in instances)
+        return instances
+
+    def update(self, instances, validated_data):
+        previous = [instance.model_time_budget_id for instance in instances]
+        instances = super().update(instances, validated_data)
+        scheduling.invalidate_busy(previous + [instance.model_time_budget_id for instance in instances])
+        return instances
+
+
+class MoneyBudgetModelSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     owner = serializers.ReadOnlyField(source='owner.username')
     model_incomes = serializers.StringRelatedField(read_only=True, many=True)
-    
+    model_expenses = serializers.StringRelatedField(read_only=True, many=True)
+
     class Meta:
         model = models.MoneyBudgetModel
-        fields = ['owner', 'money_budget_name', 'model_incomes']
+        fields = ['owner', 'money_budget_name', 'model_incomes', 'model_expenses', 'income_total', 'expense_total', 'entry_count']
+        read_only_fields = ['income_total', 'expense_total', 'entry_count']
+
+    def update(self, instance, validated_data):
+        # Only the edited columns: writing back the totals loaded with the
+        # instance would undo any adjust_totals() committed since.
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'date_modified'])
+        return instance
+
+
+class MoneyBudgetSummarySerializer(TimedRepresentationMixin, serializers.Serializer):
+    money_budget_name = serializers.CharField(read_only=True)
+    income_total = serializers.DecimalField(max_digits=models.TOTAL_DIGITS, decimal_places=2, read_only=True)
+    expense_total = serializers.DecimalField(max_digits=models.TOTAL_DIGITS, decimal_places=2, read_only=True)
+    balance = serializers.DecimalField(max_digits=models.TOTAL_DIGITS, decimal_places=2, read_only=True)
+    entry_count = serializers.IntegerField(read_only=True)
+
+
+class MoneyBudgetReportSerializer(TimedRepresentationMixin, serializers.Serializer):
+    money_budget = serializers.IntegerField(read_only=True)
+    period = serializers.DateField(read_only=True)
+    income_total = serializers.DecimalField(max_digits=models.TOTAL_DIGITS, decimal_places=2, read_only=True)
+    income_count = serializers.IntegerField(read_only=True)
+    expense_total = serializers.DecimalField(max_digits=models.TOTAL_DIGITS, decimal_places=2, read_only=True)
+    expense_count = serializers.IntegerField(read_only=True)
+
+
+def lean_decimal(value):
+    return format(value, 'f')
 
 
-class ModelIncomeSerializer(serializers.ModelSerializer):
+class LeanSerializer(TimedRepresentationMixin, serializers.BaseSerializer):
+    """
+    Read-only serializer for list responses that renders values() rows
+    directly, skipping model instances and per-field serializer machinery.
+    `lean_fields` lists (output name, values() column, formatter or None);
+    the output matches the full serializer named in each subclass.
+    """
+    lean_fields = ()
+
+    @classmethod
+    def columns(cls):
+        return [column for _, column, _ in cls.lean_fields]
+
+    def to_representation(self, row):
+        return {
+            name: row[column] if formatter is None or row[column] is None else formatter(row[column])
+            for name, column, formatter in self.lean_fields
+        }
+
+
+class ModelIncomeSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    model_budget = ModelBudgetForeignKey()
+
     class Meta:
         model = models.ModelIncome
-        fields = ['model_budget', 'model_income_name']
+        list_serializer_class = BulkListSerializer
+        fields = ['id', 'model_budget', 'model_income_name', 'amount']
+
 
+class ModelExpenseSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    model_budget = ModelBudgetForeignKey()
 
-class ModelExpenseSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.ModelExpense
-        fields = ['model_budget', 'model_expense_name']
+        list_serializer_class = BulkListSerializer
+        fields = ['id', 'model_budget', 'model_expense_name', 'amount']
 
 
-class TimeSlotModelSerializer(serializers.ModelSerializer):
+class TimeSlotModelSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    """
+    start_time and end_time are optional but go together. A scheduled slot
+    may not overlap another slot of the same time budget; in a bulk request
+    the rows are also checked against each other.
+    """
+    model_time_budget = TimeBudgetForeignKey()
+
     class Meta:
         model = models.TimeSlotModel
-        fields = ['time_slot_name', 'model_time_budget']
\ No newline at end of file
+        list_serializer_class = TimeSlotListSerializer
+        fields = ['id', 'time_slot_name', 'model_time_budget', 'start_time', 'end_time']
+
+    @staticmethod
+    def get_interval(attrs, instance):
+        """The (time_budget_id, start, end, pk) the row will have once saved, or None if unscheduled."""
+        start = attrs['start_time'] if 'start_time' in attrs else getattr(instance, 'start_time', None)
+        end = attrs['end_time'] if 'end_time' in attrs else getattr(instance, 'end_time', None)
+        if start is None and end is None:
+            return None
+        if start is None or end is None:
+            raise ValidationError('Give both start_time and end_time, or neither.')
+        if end <= start:
+            raise ValidationError({'end_time': ['End time must be after the start time.']})
+        budget_id = attrs['model_time_budget'].pk if 'model_time_budget' in attrs else instance.model_time_budget_id
+        return budget_id, start, end, getattr(instance, 'pk', None)
+
+    @staticmethod
+    def check_conflicts(intervals):
+        conflict = scheduling.find_conflict(intervals)
+        if conflict is not None:
+            start, end, pk, new = conflict[1]
+            if new:
+                raise ValidationError('Two time slots in this batch overlap.')
+            raise ValidationError('Overlaps time slot %s (%s to %s).' % (pk, start.isoformat(), end.isoformat()))
+
+    def validate(self, attrs):
+        # A bulk request's rows are checked together by validate_batch.
+        if self.parent is None:
+            interval = self.get_interval(attrs, self.instance)
+            if interval is not None:
+                self.check_conflicts([interval])
+        return attrs
+
+    def update(self, instance, validated_data):
+        # post_save drops the busy list of the budget the slot ends up in.
+        scheduling.invalidate_busy([instance.model_time_budget_id])
+        return super().update(instance, validated_data)
+
+    def validate_batch(self, rows, instances):
+        intervals = [self.get_interval(attrs, instance) for attrs, instance in zip(rows, instances or [None] * len(rows))]
+        self.check_conflicts([interval for interval in intervals if interval is not None])
+
+class LeanModelIncomeSerializer(LeanSerializer):
+    """ModelIncomeSerializer's list output."""
+    lean_fields = (
+        ('id', 'id', None),
+        ('model_budget', 'model_budget_id', None),
+        ('model_income_name', 'model_income_name', None),
+        ('amount', 'amount', lean_decimal),
+    )
+
+
+class LeanModelExpenseSerializer(LeanSerializer):
+    """ModelExpenseSerializer's list output."""
+    lean_fields = (
+        ('id', 'id', None),
+        ('model_budget', 'model_budget_id', None),
+        ('model_expense_name', 'model_expense_name', None),
+        ('amount', 'amount', lean_decimal),
+    )
+
+
+class LeanTimeSlotModelSerializer(LeanSerializer):
+    """TimeSlotModelSerializer's list output."""
+    lean_fields = (
+        ('id', 'id', None),
+        ('time_slot_name', 'time_slot_name', None),
+        ('model_time_budget', 'model_time_budget_id', None),
+        ('start_time', 'start_time', serializers.DateTimeField().to_representation),
+        ('end_time', 'end_time', serializers.DateTimeField().to_representation),
+    )
+
+
+class SparseFieldsMixin:
+    """
+    Keeps only the fields named by the `sparse_fields` argument, a dict of
+    field name to None (the whole field) or, for a nested serializer, the set
+    of its own fields to keep.
+    """
+    def __init__(self, *args, sparse_fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if sparse_fields is None:
+            return
+        for name in set(self.fields) - set(sparse_fields):
+            self.fields.pop(name)
+        for name, nested in sparse_fields.items():
+            if nested is not None:
+                child = self.fields[name].child
+                for nested_name in set(child.fields) - set(nested):
+                    child.fields.pop(nested_name)
+
+
+class ModelIncomeSnapshotSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    class Meta:
+        model = models.ModelIncome
+        fields = ['id', 'model_income_name', 'amount', 'date_created', 'date_modified']
+
+
+class ModelExpenseSnapshotSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    class Meta:
+        model = models.ModelExpense
+        fields = ['id', 'model_expense_name', 'amount', 'date_created', 'date_modified']
+
+
+class TimeSlotSnapshotSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    class Meta:
+        model = models.TimeSlotModel
+        fields = ['id', 'time_slot_name', 'start_time', 'end_time', 'date_created', 'date_modified']
+
+
+class MoneyBudgetSnapshotSerializer(SparseFieldsMixin, TimedRepresentationMixin, serializers.ModelSerializer):
+    model_incomes = ModelIncomeSnapshotSerializer(many=True, read_only=True)
+    model_expenses = ModelExpenseSnapshotSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = models.MoneyBudgetModel
+        fields = ['id', 'money_budget_name', 'income_total', 'expense_total', 'entry_count', 'date_created', 'date_modified',
+                  'model_incomes', 'model_expenses']
+
+
+class TimeBudgetSnapshotSerializer(SparseFieldsMixin, TimedRepresentationMixin, serializers.ModelSerializer):
+    time_slot_models = TimeSlotSnapshotSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = models.TimeBudgetModel
+        fields = ['id', 'time_budget_name', 'date_created', 'date_modified', 'time_slot_models']
@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import db, models, scheduling
+from .authentication import invalidate_token
+
+
+connection_created.connect(db.configure_sqlite)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    if not created:
+        for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+            invalidate_token(key)
+
+
+@receiver(post_save, sender=models.TimeSlotModel)
+@receiver(post_delete, sender=models.TimeSlotModel)
+def invalidate_time_budget_busy(sender, instance, **kwargs):
+    scheduling.invalidate_busy([instance.model_time_budget_id])
@@ -1,15 +1,40 @@
+import asyncio
+import base64
+import csv
+import gzip
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+from urllib.parse import urlencode
+
+from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.urls import reverse
 from model_mommy import mommy
 from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient, APITestCase
 from rest_framework.views import status
 
-from . import models
+from . import authentication, compression, hashers, instrumentation, ledger, models, renderers, scheduling, serializers, views
+from .asgi import BoundedASGIHandler
 
 
 class BaseViewTest(APITestCase):
     def setUp(self):
+        cache.clear()
         client = APIClient()
         client.post(reverse('signup'), {'username': 'testuser1', 'email': 'test@test.com', 'password': 'testpass'})
         self.testing_user = User.objects.get(username='testuser1')
@@ -57,7 +82,7 @@ class TimeBudgetModelTestCase(BaseViewTest):
         mommy.make(models.TimeBudgetModel, owner=self.testing_user, _quantity=10)
         response = self.client.get(reverse('time_budget_model'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 10)
+        self.assertEqual(len(response.data['results']), 10)
 
     def test_user_can_view_a_time_budget(self):
         mommy.make(models.TimeBudgetModel, time_budget_name='testmodelbudget', owner=self.testing_user)
@@ -98,7 +123,7 @@ class MonetaryBudgetModelTestCase(BaseViewTest):
         mommy.make(models.MoneyBudgetModel, owner=self.testing_user, _quantity=10)
         response = self.client.get(reverse('money_budget_model'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 10)
+        self.assertEqual(len(response.data['results']), 10)
 
     def test_user_can_view_a_money_budget(self):
         mommy.make(models.MoneyBudgetModel, money_budget_name='testmodelbudget', owner=self.testing_user)
@@ -142,7 +167,7 @@ class TestMoneyBudgetModelIncome(BaseViewTest):
         mommy.make(models.ModelIncome, owner=self.testing_user, model_budget = model_budget, _quantity=10)
         model_income_view_response = self.client.get(reverse('model_income_list_create'))
         self.assertEqual(model_income_view_response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(model_income_view_response.data), 10)
+        self.assertEqual(len(model_income_view_response.data['results']), 10)
 
     def test_user_can_update_a_model_income(self):
         model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
@@ -185,7 +210,7 @@ class TestMoneyBudgetModelExpense(BaseViewTest):
         mommy.make(models.ModelExpense, owner=self.testing_user, model_budget = model_budget, _quantity=10)
         model_expense_view_response = self.client.get(reverse('model_expense_list_create'))
         self.assertEqual(model_expense_view_response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(model_expense_view_response.data), 10)
+        self.assertEqual(len(model_expense_view_response.data['results']), 10)
 
     def test_user_can_update_a_model_expense(self):
         model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
@@ -228,7 +253,7 @@ class TestTimeSlotModel(BaseViewTest):
         mommy.make(models.TimeSlotModel, owner=self.testing_user, model_time_budget = model_time_budget, _quantity=10)
         response = self.client.get(reverse('time_slot_model_list_create'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 10)
+        self.assertEqual(len(response.data['results']), 10)
 
     def test_user_can_update_a_model_expense(self):
         model_time_budget = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
@@ -256,4 +281,1286 @@ class TestTimeSlotModel(BaseViewTest):
         response = self.client2.get(reverse('time_slot_model_details', kwargs={'pk': 1}))
         response2 = self.client.get(reverse('time_slot_model_details', kwargs={'pk': 1}))
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
-        self.assertEqual(response2.status_code, status.HTTP_200_OK)
\ No newline at end of file
+        self.assertEqual(response2.status_code, status.HTTP_200_OK)
+
+class TestTimeSlotScheduling(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        self.time_budget = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+        self.slot = self.create_slot('09:00', '10:00').data
+
+    def create_slot(self, start, end, time_budget=None, client=None):
+        return (client or self.client).post(reverse('time_slot_model_list_create'), {
+            'time_slot_name': 'slot', 'model_time_budget': (time_budget or self.time_budget).pk,
+            'start_time': '2020-05-04T%s:00Z' % start, 'end_time': '2020-05-04T%s:00Z' % end,
+        }, format='json')
+
+    def test_overlapping_slots_are_rejected(self):
+        self.assertEqual(self.create_slot('09:30', '11:00').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.create_slot('08:00', '09:01').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.create_slot('10:00', '11:00').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.create_slot('08:00', '09:00').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.create_slot('07:00', '12:00').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_slots_in_other_budgets_may_overlap(self):
+        other_budget = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+        self.assertEqual(self.create_slot('09:00', '10:00', other_budget).status_code, status.HTTP_201_CREATED)
+
+    def test_times_must_be_ordered_and_paired(self):
+        self.assertEqual(self.create_slot('11:00', '10:30').status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('time_slot_model_list_create'), {
+            'time_slot_name': 'slot', 'model_time_budget': self.time_budget.pk, 'start_time': '2020-05-04T11:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_a_slot_can_be_moved_without_conflicting_with_itself(self):
+        slot = models.TimeSlotModel.objects.get(start_time__isnull=False)
+        response = self.client.patch(reverse('time_slot_model_details', kwargs={'pk': slot.pk}), {'end_time': '2020-05-04T10:30:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bulk_rows_are_checked_against_each_other(self):
+        rows = [
+            {'time_slot_name': 'a', 'model_time_budget': self.time_budget.pk, 'start_time': '2020-05-04T12:00:00Z', 'end_time': '2020-05-04T13:00:00Z'},
+            {'time_slot_name': 'b', 'model_time_budget': self.time_budget.pk, 'start_time': '2020-05-04T12:30:00Z', 'end_time': '2020-05-04T14:00:00Z'},
+        ]
+        response = self.client.post(reverse('time_slot_model_bulk'), rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        rows[1]['start_time'] = '2020-05-04T09:30:00Z'
+        self.assertEqual(self.client.post(reverse('time_slot_model_bulk'), rows, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        rows[1]['start_time'] = '2020-05-04T13:00:00Z'
+        self.assertEqual(self.client.post(reverse('time_slot_model_bulk'), rows, format='json').status_code, status.HTTP_201_CREATED)
+
+    def test_availability_lists_busy_and_free_intervals(self):
+        self.create_slot('13:00', '14:00')
+        url = reverse('time_budget_availability', kwargs={'pk': self.time_budget.pk})
+        self.client.get(url, {'start': '2020-05-04T09:30:00Z', 'end': '2020-05-04T15:00:00Z'})
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'start': '2020-05-04T09:30:00Z', 'end': '2020-05-04T15:00:00Z'})
+        self.assertEqual([(slot['start_time'], slot['end_time']) for slot in response.data['busy']], [
+            ('2020-05-04T09:00:00Z', '2020-05-04T10:00:00Z'), ('2020-05-04T13:00:00Z', '2020-05-04T14:00:00Z')])
+        self.assertEqual([(free['start'].isoformat(), free['end'].isoformat()) for free in response.data['free']], [
+            ('2020-05-04T10:00:00+00:00', '2020-05-04T13:00:00+00:00'), ('2020-05-04T14:00:00+00:00', '2020-05-04T15:00:00+00:00')])
+
+    def test_availability_is_owner_only_and_needs_a_window(self):
+        url = reverse('time_budget_availability', kwargs={'pk': self.time_budget.pk})
+        window = {'start': '2020-05-04', 'end': '2020-05-05'}
+        self.assertEqual(self.client2.get(url, window).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(url, {'start': '2020-05-04'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'start': '2020-05-05', 'end': '2020-05-04'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestFreeBusy(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        self.work = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+        self.gym = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+        for time_budget, start, end in ((self.work, 9, 12), (self.work, 13, 17), (self.gym, 11, 14), (self.gym, 18, 19)):
+            self.make_slot(time_budget, start, end)
+        self.window = {'start': '2020-05-04T08:00:00Z', 'end': '2020-05-04T20:00:00Z'}
+
+    def make_slot(self, time_budget, start, end):
+        return mommy.make(models.TimeSlotModel, owner=self.testing_user, model_time_budget=time_budget,
+                          start_time=timezone.datetime(2020, 5, 4, start, tzinfo=timezone.utc),
+                          end_time=timezone.datetime(2020, 5, 4, end, tzinfo=timezone.utc))
+
+    def hours(self, intervals):
+        return [(interval['start'].hour, interval['end'].hour) for interval in intervals]
+
+    def test_busy_intervals_are_merged_across_budgets(self):
+        response = self.client.get(reverse('free_busy'), self.window)
+        self.assertEqual(self.hours(response.data['busy']), [(9, 17), (18, 19)])
+        self.assertEqual(self.hours(response.data['free']), [(8, 9), (17, 18), (19, 20)])
+
+    def test_budgets_can_be_selected(self):
+        response = self.client.get(reverse('free_busy'), dict(self.window, time_budgets='%s' % self.gym.pk))
+        self.assertEqual(self.hours(response.data['busy']), [(11, 14), (18, 19)])
+        response = self.client2.get(reverse('free_busy'), dict(self.window, time_budgets='%s' % self.gym.pk))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_windows_at_the_end_of_time_and_huge_ids_are_handled(self):
+        window = {'start': '9999-12-30T00:00:00Z', 'end': '9999-12-31T00:00:00Z'}
+        for url in (reverse('free_busy'), reverse('time_budget_availability', kwargs={'pk': self.work.pk})):
+            self.assertEqual(self.client.get(url, window).status_code, status.HTTP_200_OK)
+            response = self.client.get(url, {'start': '9999-12-31', 'end': '9999-12-30'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for time_budgets in ('9' * 20, '%s,%s' % (self.work.pk, 2 ** 63)):
+            response = self.client.get(reverse('free_busy'), dict(self.window, time_budgets=time_budgets))
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_merge_intervals_joins_touching_and_nested_intervals(self):
+        self.assertEqual(scheduling.merge_intervals([(1, 3), (2, 4), (4, 5), (6, 9), (7, 8)]), [(1, 5), (6, 9)])
+
+    def test_find_free_windows(self):
+        response = self.client.get(reverse('free_windows'), dict(self.window, duration=30, count=3))
+        self.assertEqual([(window['start'].hour, window['start'].minute) for window in response.data['windows']], [(8, 0), (8, 30), (17, 0)])
+        response = self.client.get(reverse('free_windows'), dict(self.window, duration=90))
+        self.assertEqual(response.data['windows'], [])
+        self.assertEqual(self.client.get(reverse('free_windows'), self.window).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_free_window_sizes_are_bounded(self):
+        for params in ({'duration': '9' * 20}, {'duration': 12 * 60 + 1}, {'duration': 30, 'count': 101}, {'duration': 30, 'count': '9' * 5000}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('free_windows'), dict(self.window, **params))
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('free_windows'), {'start': '9999-12-31T00:00:00Z', 'end': '9999-12-31T23:59:00Z', 'duration': 1000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['windows']), 1)
+
+    def test_busy_lists_are_cached_until_slots_change(self):
+        self.client.get(reverse('free_busy'), self.window)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('free_busy'), self.window)
+        slot = self.make_slot(self.gym, 19, 20)
+        self.assertEqual(self.hours(self.client.get(reverse('free_busy'), self.window).data['busy']), [(9, 17), (18, 20)])
+        slot.delete()
+        self.assertEqual(self.hours(self.client.get(reverse('free_busy'), self.window).data['busy']), [(9, 17), (18, 19)])
+
+    def test_bulk_writes_invalidate_busy_lists(self):
+        self.client.get(reverse('free_busy'), self.window)
+        response = self.client.post(reverse('time_slot_model_bulk'), [{
+            'time_slot_name': 'late', 'model_time_budget': self.work.pk,
+            'start_time': '2020-05-04T19:00:00Z', 'end_time': '2020-05-04T20:00:00Z'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.hours(self.client.get(reverse('free_busy'), self.window).data['busy']), [(9, 17), (18, 20)])
+
+    def test_moving_a_slot_invalidates_both_budgets(self):
+        slot = models.TimeSlotModel.objects.get(model_time_budget=self.gym, start_time__hour=18)
+        self.client.get(reverse('free_busy'), self.window)
+        response = self.client.patch(reverse('time_slot_model_details', kwargs={'pk': slot.pk}), {'model_time_budget': self.work.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse('free_busy'), dict(self.window, time_budgets='%s' % self.gym.pk))
+        self.assertEqual(self.hours(response.data['busy']), [(11, 14)])
+
+
+class TestCursorPagination(BaseViewTest):
+    def test_list_is_paginated_with_a_cursor(self):
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        mommy.make(models.ModelIncome, owner=self.testing_user, model_budget=model_budget, _quantity=5)
+        response = self.client.get(reverse('model_income_list_create'), {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_cursor_walks_every_row_once_in_order(self):
+        mommy.make(models.TimeBudgetModel, owner=self.testing_user, _quantity=7)
+        names = []
+        url = reverse('time_budget_model') + '?page_size=3'
+        while url:
+            response = self.client.get(url)
+            names.extend(item['time_budget_name'] for item in response.data['results'])
+            url = response.data['next']
+        expected = list(models.TimeBudgetModel.objects.order_by('date_created', 'id').values_list('time_budget_name', flat=True))
+        self.assertEqual(names, expected)
+
+    def test_previous_cursor_returns_the_preceding_page(self):
+        mommy.make(models.TimeBudgetModel, owner=self.testing_user, _quantity=5)
+        first = self.client.get(reverse('time_budget_model'), {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        previous = self.client.get(second.data['previous'])
+        self.assertEqual(previous.data['results'], first.data['results'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('time_budget_model'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_values_out_of_range_are_rejected(self):
+        for tokens in ({'d': '2020-05-04T00:00:00+00:00', 'i': 2 ** 63}, {'d': '2020-05-04T00:00:00+00:00', 'i': '9' * 30},
+                       {'d': '9999-12-31T23:00:00-05:00', 'i': 1}, {'d': '2020-05-04T00:00:00', 'i': 1}):
+            with self.subTest(tokens=tokens):
+                cursor = base64.b64encode(urlencode(tokens).encode('ascii')).decode('ascii')
+                response = self.client.get(reverse('model_income_list_create'), {'cursor': cursor})
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestLeanListsAndFastJSON(BaseViewTest):
+    def test_lean_serializers_match_the_full_serializers(self):
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        time_budget = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+        mommy.make(models.ModelIncome, owner=self.testing_user, model_budget=model_budget, amount=Decimal('0'))
+        mommy.make(models.ModelExpense, owner=self.testing_user, model_budget=model_budget, amount=Decimal('12.5'))
+        mommy.make(models.TimeSlotModel, owner=self.testing_user, model_time_budget=time_budget)
+        mommy.make(models.TimeSlotModel, owner=self.testing_user, model_time_budget=time_budget,
+                   start_time=timezone.datetime(2020, 5, 4, 9, 30, 15, 250, tzinfo=timezone.utc),
+                   end_time=timezone.datetime(2020, 5, 4, 10, tzinfo=timezone.utc))
+        for model, full, lean in (
+                (models.ModelIncome, serializers.ModelIncomeSerializer, serializers.LeanModelIncomeSerializer),
+                (models.ModelExpense, serializers.ModelExpenseSerializer, serializers.LeanModelExpenseSerializer),
+                (models.TimeSlotModel, serializers.TimeSlotModelSerializer, serializers.LeanTimeSlotModelSerializer)):
+            with self.subTest(model=model.__name__):
+                queryset = model.objects.order_by('id')
+                self.assertEqual(lean(queryset.values(*lean.columns()), many=True).data, full(queryset, many=True).data)
+
+    def test_lean_lists_page_with_a_cursor(self):
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        mommy.make(models.ModelExpense, owner=self.testing_user, model_budget=model_budget, _quantity=5)
+        first = self.client.get(reverse('model_expense_list_create'), {'page_size': 3})
+        second = self.client.get(first.data['next'])
+        self.assertEqual(len(second.data['results']), 2)
+        self.assertEqual(self.client.get(second.data['previous']).data['results'], first.data['results'])
+
+    @skipUnless(renderers.orjson, 'orjson is not installed.')
+    def test_fast_renderer_matches_json_renderer(self):
+        data = {'amount': Decimal('1.50'), 'when': timezone.datetime(2020, 5, 4, 9, 30, tzinfo=timezone.utc), 1: [None, 'é', 2.5],
+                'separators': 'x\u2028y\u2029z'}
+        self.assertEqual(renderers.FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertIn(b'x\\u2028y\\u2029z', renderers.FastJSONRenderer().render(data))
+
+    @skipUnless(renderers.orjson, 'orjson is not installed.')
+    def test_fast_renderer_writes_non_finite_floats_as_null(self):
+        # The documented difference from JSONRenderer, which refuses them.
+        with self.assertRaises(ValueError):
+            JSONRenderer().render([float('nan')])
+        self.assertEqual(renderers.FastJSONRenderer().render([float('nan'), float('inf')]), b'[null,null]')
+
+    def test_fast_parser_accepts_json_bodies(self):
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        response = self.client.post(reverse('model_income_list_create'), {'model_income_name': 'salary', 'model_budget': model_budget.pk, 'amount': '10.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('model_income_list_create'), '{"model_income_name": ', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestResponseCompression(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        mommy.make(models.ModelIncome, owner=self.testing_user, model_budget=model_budget, _quantity=40)
+
+    def test_encoding_negotiation(self):
+        self.assertEqual(compression.choose_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(compression.choose_encoding('*'), 'br' if compression.brotli else 'gzip')
+        self.assertIsNone(compression.choose_encoding('gzip;q=0, identity'))
+        self.assertIsNone(compression.choose_encoding(''))
+
+    def test_large_bodies_are_gzipped_when_accepted(self):
+        identity = self.client.get(reverse('model_income_list_create'))
+        response = self.client.get(reverse('model_income_list_create'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', identity)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), identity.content)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertIn('compress;dur=', response['Server-Timing'])
+
+    def test_small_bodies_are_sent_as_they_are(self):
+        response = self.client.get(reverse('model_income_list_create'), {'page_size': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_streaming_exports_are_compressed_incrementally(self):
+        url = reverse('ledger_export', kwargs={'export_format': 'csv'})
+        identity = b''.join(self.client.get(url).streaming_content)
+        with override_settings(COMPRESSION_STREAMING_FLUSH_SIZE=64):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            chunks = list(response.streaming_content)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), identity)
+
+    def test_compact_field_names(self):
+        response = self.client.get(reverse('model_income_list_create'), {'compact': 1, 'page_size': 1})
+        row = json.loads(response.content)['results'][0]
+        self.assertEqual(set(row), {renderers.COMPACT_FIELD_NAMES.get(key, key) for key in response.data['results'][0]})
+        self.assertTrue({'name', 'mb', 'amt'} <= set(row))
+        self.assertEqual(row['name'], response.data['results'][0]['model_income_name'])
+
+
+@override_settings(LIST_CACHE_TIMEOUT=0)
+class TestQueryCounts(BaseViewTest):
+    """
+    Pin the number of queries per endpoint so N+1 regressions fail the suite.
+    List ETags come from the cache, so a list page is a single query plus its prefetches.
+    """
+    def setUp(self):
+        super().setUp()
+        self.money_budgets = mommy.make(models.MoneyBudgetModel, owner=self.testing_user, _quantity=5)
+        self.time_budgets = mommy.make(models.TimeBudgetModel, owner=self.testing_user, _quantity=5)
+        for money_budget in self.money_budgets:
+            mommy.make(models.ModelIncome, owner=self.testing_user, model_budget=money_budget, _quantity=3)
+            mommy.make(models.ModelExpense, owner=self.testing_user, model_budget=money_budget, _quantity=3)
+        for time_budget in self.time_budgets:
+            mommy.make(models.TimeSlotModel, owner=self.testing_user, model_time_budget=time_budget, _quantity=3)
+
+    def assertGetQueries(self, url, expected):
+        # The first request also loads the token; later ones hit the auth cache.
+        with self.assertNumQueries(expected + 1):
+            self.client.get(url)
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_time_budget_list_queries(self):
+        self.assertGetQueries(reverse('time_budget_model'), 1)
+
+    def test_time_budget_detail_queries(self):
+        self.assertGetQueries(reverse('time_budget_model_details', kwargs={'pk': self.time_budgets[0].pk}), 1)
+
+    def test_money_budget_list_queries(self):
+        response = self.assertGetQueries(reverse('money_budget_model'), 3)
+        self.assertEqual(len(response.data['results'][0]['model_incomes']), 3)
+        self.assertEqual(len(response.data['results'][0]['model_expenses']), 3)
+
+    def test_money_budget_detail_queries(self):
+        self.assertGetQueries(reverse('money_budget_details', kwargs={'pk': self.money_budgets[0].pk}), 3)
+
+    def test_model_income_list_queries(self):
+        self.assertGetQueries(reverse('model_income_list_create'), 1)
+
+    def test_model_expense_list_queries(self):
+        self.assertGetQueries(reverse('model_expense_list_create'), 1)
+
+    def test_time_slot_list_queries(self):
+        self.assertGetQueries(reverse('time_slot_model_list_create'), 1)
+
+
+class TestMoneyBudgetSummary(BaseViewTest):
+    def test_summary_totals_incomes_and_expenses(self):
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        for _ in range(2):
+            self.client.post(reverse('model_income_list_create'), {'model_income_name': 'salary', 'model_budget': model_budget.pk, 'amount': '100.50'})
+        for _ in range(3):
+            self.client.post(reverse('model_expense_list_create'), {'model_expense_name': 'rent', 'model_budget': model_budget.pk, 'amount': '40.25'})
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('money_budget_summary', kwargs={'pk': model_budget.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['income_total'], '201.00')
+        self.assertEqual(response.data['expense_total'], '120.75')
+        self.assertEqual(response.data['balance'], '80.25')
+        self.assertEqual(response.data['entry_count'], 5)
+
+    def test_summary_of_an_empty_budget_is_zero(self):
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        response = self.client.get(reverse('money_budget_summary', kwargs={'pk': model_budget.pk}))
+        self.assertEqual(response.data['balance'], '0.00')
+        self.assertEqual(response.data['entry_count'], 0)
+
+    def test_summary_requires_authorisation(self):
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        response = self.client2.get(reverse('money_budget_summary', kwargs={'pk': model_budget.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+
+class TestDateRangeReports(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        self.model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        for day, amount in (('2020-04-30', '5.00'), ('2020-05-01', '10.00'), ('2020-05-02', '20.00'), ('2020-05-31', '40.00')):
+            income = mommy.make(models.ModelIncome, owner=self.testing_user, model_budget=self.model_budget, amount=Decimal(amount))
+            models.ModelIncome.objects.filter(pk=income.pk).update(date_created=timezone.make_aware(timezone.datetime.strptime(day + ' 12:00', '%Y-%m-%d %H:%M')))
+        expense = mommy.make(models.ModelExpense, owner=self.testing_user, model_budget=self.model_budget, amount=Decimal('7.00'))
+        models.ModelExpense.objects.filter(pk=expense.pk).update(date_created=timezone.make_aware(timezone.datetime(2020, 5, 2, 8)))
+
+    def test_list_is_filtered_by_date_range(self):
+        response = self.client.get(reverse('model_income_list_create'), {'since': '2020-05-01', 'until': '2020-05-31'})
+        self.assertEqual([income['amount'] for income in response.data['results']], ['10.00', '20.00', '40.00'])
+        response = self.client.get(reverse('model_income_list_create'), {'since': '2020-05-01T13:00:00Z'})
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(reverse('model_expense_list_create'), {'until': '2020-05-01'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_invalid_range_is_rejected(self):
+        response = self.client.get(reverse('model_income_list_create'), {'since': 'last month'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('since', response.data)
+
+    def test_out_of_range_bounds_are_rejected(self):
+        for url in (reverse('model_income_list_create'), reverse('model_expense_list_create'), reverse('money_budget_report')):
+            for params in ({'until': '9999-12-31'}, {'since': '9999-12-31T23:00:00-05:00'}, {'since': '0001-01-01T00:00:00+01:00'}):
+                with self.subTest(url=url, params=params):
+                    self.assertEqual(self.client.get(url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_report_rejects_ids_out_of_range(self):
+        for money_budget in ('9' * 20, '9' * 5000, str(2 ** 63), '\u00b2'):
+            response = self.client.get(reverse('money_budget_report'), {'money_budget': money_budget})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('money_budget_report'), {'money_budget': str(2 ** 63 - 1)})
+        self.assertEqual(response.data, [])
+
+    def test_monthly_report(self):
+        self.client.get(reverse('money_budget_report'))
+        # One grouped query each for incomes and expenses once the token is cached.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('money_budget_report'), {'period': 'month'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(row['period'], row['income_total'], row['income_count'], row['expense_total']) for row in response.data], [
+            ('2020-04-01', '5.00', 1, '0.00'),
+            ('2020-05-01', '70.00', 3, '7.00'),
+        ])
+        self.assertEqual(response.data[0]['money_budget'], self.model_budget.pk)
+
+    def test_daily_report_within_a_range(self):
+        response = self.client.get(reverse('money_budget_report'), {'period': 'day', 'since': '2020-05-01', 'until': '2020-05-02'})
+        self.assertEqual([(row['period'], row['income_total'], row['expense_count']) for row in response.data], [
+            ('2020-05-01', '10.00', 0),
+            ('2020-05-02', '20.00', 1),
+        ])
+
+    def test_weekly_report_starts_on_mondays(self):
+        response = self.client.get(reverse('money_budget_report'), {'period': 'week'})
+        self.assertEqual([row['period'] for row in response.data], ['2020-04-27', '2020-05-25'])
+
+    def test_report_is_per_user_and_budget(self):
+        self.assertEqual(self.client2.get(reverse('money_budget_report')).data, [])
+        other_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        response = self.client.get(reverse('money_budget_report'), {'money_budget': other_budget.pk})
+        self.assertEqual(response.data, [])
+
+    def test_unknown_period_is_rejected(self):
+        response = self.client.get(reverse('money_budget_report'), {'period': 'year'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestBudgetSnapshots(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        self.model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user, money_budget_name='home')
+        mommy.make(models.ModelIncome, owner=self.testing_user, model_budget=self.model_budget, amount=Decimal('5.00'), _quantity=3)
+        mommy.make(models.ModelExpense, owner=self.testing_user, model_budget=self.model_budget, amount=Decimal('2.00'), _quantity=2)
+        mommy.make(models.ModelIncome, owner=self.testing_user, _quantity=2)
+        self.url = reverse('money_budget_snapshot', kwargs={'pk': self.model_budget.pk})
+        self.client.get(self.url)
+
+    def test_snapshot_nests_children_with_one_query_per_relation(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['money_budget_name'], 'home')
+        self.assertEqual([income['amount'] for income in response.data['model_incomes']], ['5.00'] * 3)
+        self.assertEqual(len(response.data['model_expenses']), 2)
+
+    def test_sparse_fieldsets_skip_columns_and_relations(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'money_budget_name,model_incomes.amount'})
+        self.assertEqual(set(response.data), {'money_budget_name', 'model_incomes'})
+        self.assertEqual(response.data['model_incomes'][0], {'amount': '5.00'})
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('model_income_name', queries[1]['sql'])
+        self.assertNotIn('income_total', queries[0]['sql'])
+
+    def test_unknown_fields_are_rejected(self):
+        for fields in ('colour', 'model_incomes.colour', 'money_budget_name.id'):
+            with self.subTest(fields=fields):
+                self.assertEqual(self.client.get(self.url, {'fields': fields}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_snapshot_is_owner_only(self):
+        self.assertEqual(self.client2.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_time_budget_snapshot(self):
+        time_budget = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+        mommy.make(models.TimeSlotModel, owner=self.testing_user, model_time_budget=time_budget, _quantity=4)
+        response = self.client.get(reverse('time_budget_snapshot', kwargs={'pk': time_budget.pk}), {'fields': 'id,time_slot_models'})
+        self.assertEqual(response.data['id'], time_budget.pk)
+        self.assertEqual(len(response.data['time_slot_models']), 4)
+        self.assertIn('time_slot_name', response.data['time_slot_models'][0])
+
+
+class TestMoneyBudgetTotals(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        self.model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+
+    def assertTotals(self, model_budget, income_total, expense_total, entry_count):
+        model_budget.refresh_from_db()
+        self.assertEqual(model_budget.income_total, Decimal(income_total))
+        self.assertEqual(model_budget.expense_total, Decimal(expense_total))
+        self.assertEqual(model_budget.entry_count, entry_count)
+
+    def test_creating_entries_updates_totals(self):
+        self.client.post(reverse('model_income_list_create'), {'model_income_name': 'salary', 'model_budget': self.model_budget.pk, 'amount': '500.00'})
+        self.client.post(reverse('model_expense_list_create'), {'model_expense_name': 'rent', 'model_budget': self.model_budget.pk, 'amount': '120.00'})
+        self.assertTotals(self.model_budget, '500.00', '120.00', 2)
+
+    def test_updating_an_entry_adjusts_totals(self):
+        response = self.client.post(reverse('model_income_list_create'), {'model_income_name': 'salary', 'model_budget': self.model_budget.pk, 'amount': '500.00'})
+        income = models.ModelIncome.objects.get(model_income_name=response.data['model_income_name'])
+        self.client.patch(reverse('model_income_details', kwargs={'pk': income.pk}), {'amount': '450.00'})
+        self.assertTotals(self.model_budget, '450.00', '0', 1)
+
+    def test_moving_an_entry_between_budgets_moves_its_totals(self):
+        other_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        self.client.post(reverse('model_expense_list_create'), {'model_expense_name': 'rent', 'model_budget': self.model_budget.pk, 'amount': '120.00'})
+        expense = models.ModelExpense.objects.get()
+        self.client.patch(reverse('model_expense_details', kwargs={'pk': expense.pk}), {'model_budget': other_budget.pk})
+        self.assertTotals(self.model_budget, '0', '0', 0)
+        self.assertTotals(other_budget, '0', '120.00', 1)
+
+    def test_deleting_an_entry_adjusts_totals(self):
+        self.client.post(reverse('model_expense_list_create'), {'model_expense_name': 'rent', 'model_budget': self.model_budget.pk, 'amount': '120.00'})
+        expense = models.ModelExpense.objects.get()
+        self.client.delete(reverse('model_expense_details', kwargs={'pk': expense.pk}))
+        self.assertTotals(self.model_budget, '0', '0', 0)
+
+    def test_renaming_a_budget_keeps_concurrent_adjustments(self):
+        get_object = views.MoneyBudgetModelDetails.get_object
+
+        def get_object_then_adjust(view):
+            model_budget = get_object(view)
+            models.MoneyBudgetModel.objects.filter(pk=model_budget.pk).adjust_totals(income_total=Decimal('100.00'), entry_count=1)
+            return model_budget
+
+        with mock.patch.object(views.MoneyBudgetModelDetails, 'get_object', get_object_then_adjust):
+            for method in (self.client.put, self.client.patch):
+                response = method(reverse('money_budget_details', kwargs={'pk': self.model_budget.pk}), {'money_budget_name': 'renamed'})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTotals(self.model_budget, '200.00', '0', 2)
+        self.assertEqual(self.model_budget.money_budget_name, 'renamed')
+
+    def test_totals_have_room_for_many_maximal_amounts(self):
+        rows = [{'model_income_name': 'income %d' % i, 'model_budget': self.model_budget.pk, 'amount': '9999999999.99'} for i in range(100)]
+        for _ in range(2):
+            self.assertEqual(self.client.post(reverse('model_income_bulk'), rows, format='json').status_code, status.HTTP_201_CREATED)
+        self.assertTotals(self.model_budget, '1999999999998.00', '0', 200)
+        for url in (reverse('money_budget_model'), reverse('money_budget_details', kwargs={'pk': self.model_budget.pk}),
+                    reverse('money_budget_summary', kwargs={'pk': self.model_budget.pk}), reverse('money_budget_report')):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK, url)
+        call_command('recompute_budget_totals', '--check', stdout=StringIO())
+
+    def test_recompute_command_repairs_drift(self):
+        mommy.make(models.ModelIncome, owner=self.testing_user, model_budget=self.model_budget, amount=Decimal('10.00'), _quantity=3)
+        with self.assertRaises(CommandError):
+            call_command('recompute_budget_totals', '--check', stdout=StringIO())
+        call_command('recompute_budget_totals', stdout=StringIO())
+        self.assertTotals(self.model_budget, '30.00', '0', 3)
+        call_command('recompute_budget_totals', '--check', stdout=StringIO())
+
+    def test_recompute_command_keeps_entries_written_while_it_runs(self):
+        mommy.make(models.ModelIncome, owner=self.testing_user, model_budget=self.model_budget, amount=Decimal('10.00'), _quantity=3)
+        select_for_update = models.MoneyBudgetQuerySet.select_for_update
+
+        def write_then_lock(queryset, *args, **kwargs):
+            self.client.post(reverse('model_income_list_create'), {'model_income_name': 'salary', 'model_budget': self.model_budget.pk, 'amount': '500.00'})
+            return select_for_update(queryset, *args, **kwargs)
+
+        with mock.patch.object(models.MoneyBudgetQuerySet, 'select_for_update', write_then_lock):
+            call_command('recompute_budget_totals', stdout=StringIO())
+        self.assertTotals(self.model_budget, '530.00', '0', 4)
+
+
+class TestBulkEndpoints(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        self.model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+
+    def income_rows(self, count, amount='10.00'):
+        return [{'model_income_name': 'income %d' % i, 'model_budget': self.model_budget.pk, 'amount': amount} for i in range(count)]
+
+    def test_bulk_create_incomes(self):
+        response = self.client.post(reverse('model_income_bulk'), self.income_rows(5), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 5)
+        self.model_budget.refresh_from_db()
+        self.assertEqual(self.model_budget.income_total, Decimal('50.00'))
+        self.assertEqual(self.model_budget.entry_count, 5)
+
+    def test_bulk_create_query_count_does_not_grow_with_rows(self):
+        self.client.get(reverse('model_income_list_create'))
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(reverse('model_income_bulk'), self.income_rows(2), format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(reverse('model_income_bulk'), self.income_rows(40), format='json')
+        self.assertEqual(len(small), len(large))
+
+    def test_bulk_create_retries_are_replayed(self):
+        first = self.client.post(reverse('model_income_bulk'), self.income_rows(5), format='json', HTTP_IDEMPOTENCY_KEY='batch-1')
+        retry = self.client.post(reverse('model_income_bulk'), self.income_rows(5), format='json', HTTP_IDEMPOTENCY_KEY='batch-1')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(models.ModelIncome.objects.count(), 5)
+        self.model_budget.refresh_from_db()
+        self.assertEqual(self.model_budget.income_total, Decimal('50.00'))
+
+    def test_bulk_create_rejects_budgets_of_other_users(self):
+        other_budget = mommy.make(models.MoneyBudgetModel, owner=User.objects.get(username='testuser2'))
+        rows = self.income_rows(2) + [{'model_income_name': 'stolen', 'model_budget': other_budget.pk, 'amount': '1.00'}]
+        response = self.client.post(reverse('model_income_bulk'), rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(models.ModelIncome.objects.count(), 0)
+
+    def test_bulk_update_expenses(self):
+        self.client.post(reverse('model_expense_bulk'), [
+            {'model_expense_name': 'rent', 'model_budget': self.model_budget.pk, 'amount': '100.00'},
+            {'model_expense_name': 'food', 'model_budget': self.model_budget.pk, 'amount': '50.00'},
+        ], format='json')
+        ids = list(models.ModelExpense.objects.order_by('id').values_list('id', flat=True))
+        response = self.client.patch(reverse('model_expense_bulk'), [
+            {'id': ids[0], 'amount': '80.00'},
+            {'id': ids[1], 'model_expense_name': 'groceries'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(models.ModelExpense.objects.get(pk=ids[1]).model_expense_name, 'groceries')
+        self.model_budget.refresh_from_db()
+        self.assertEqual(self.model_budget.expense_total, Decimal('130.00'))
+
+    def test_bulk_update_takes_the_ids_the_api_returned(self):
+        created = self.client.post(reverse('model_income_bulk'), self.income_rows(3), format='json')
+        ids = [row['id'] for row in created.data]
+        response = self.client.patch(reverse('model_income_bulk'), [{'id': pk, 'amount': '20.00'} for pk in ids], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data], ids)
+        single = self.client.post(reverse('model_income_list_create'), self.income_rows(1)[0], format='json')
+        listed = self.client.get(reverse('model_income_list_create'))
+        self.assertEqual([row['id'] for row in listed.data['results']], ids + [single.data['id']])
+        self.model_budget.refresh_from_db()
+        self.assertEqual(self.model_budget.income_total, Decimal('70.00'))
+
+    def test_bulk_update_rejects_unknown_ids(self):
+        response = self.client.patch(reverse('model_expense_bulk'), [{'id': 999, 'amount': '1.00'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_delete_time_slots(self):
+        model_time_budget = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+        slots = mommy.make(models.TimeSlotModel, owner=self.testing_user, model_time_budget=model_time_budget, _quantity=4)
+        response = self.client.delete(reverse('time_slot_model_bulk'), [slot.pk for slot in slots[:3]], format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(models.TimeSlotModel.objects.count(), 1)
+
+    def test_bulk_delete_only_touches_own_rows(self):
+        self.client2.post(reverse('money_budget_model'), {'money_budget_name': 'other'})
+        other_budget = models.MoneyBudgetModel.objects.get(money_budget_name='other')
+        self.client2.post(reverse('model_income_bulk'), [{'model_income_name': 'theirs', 'model_budget': other_budget.pk, 'amount': '5.00'}], format='json')
+        self.client.delete(reverse('model_income_bulk'), list(models.ModelIncome.objects.values_list('id', flat=True)), format='json')
+        self.assertEqual(models.ModelIncome.objects.count(), 1)
+
+
+class TestLedgerExport(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        mommy.make(models.ModelIncome, owner=self.testing_user, model_budget=model_budget, amount=Decimal('12.50'), _quantity=3)
+        mommy.make(models.ModelExpense, owner=self.testing_user, model_budget=model_budget, _quantity=2)
+        model_time_budget = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+        mommy.make(models.TimeSlotModel, owner=self.testing_user, model_time_budget=model_time_budget, _quantity=2)
+
+    def test_export_csv_streams_every_row(self):
+        response = self.client.get(reverse('ledger_export', kwargs={'export_format': 'csv'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'kind,id,parent_id,name,amount,date_created,date_modified')
+        self.assertEqual(len(lines), 1 + 1 + 1 + 3 + 2 + 2)
+
+    def test_export_ndjson_only_contains_own_rows(self):
+        mommy.make(models.ModelIncome, owner=User.objects.get(username='testuser2'))
+        response = self.client.get(reverse('ledger_export', kwargs={'export_format': 'ndjson'}))
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        incomes = [row for row in rows if row['kind'] == 'income']
+        self.assertEqual(len(incomes), 3)
+        self.assertEqual(incomes[0]['amount'], '12.50')
+
+    def test_unknown_export_format_is_not_found(self):
+        response = self.client.get(reverse('ledger_export', kwargs={'export_format': 'xml'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_ledger_command_writes_a_file_per_user(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            call_command('export_ledger', 'testuser1', 'testuser2', '--format', 'ndjson', '--output-dir', output_dir, stdout=StringIO())
+            self.assertEqual(sorted(os.listdir(output_dir)), ['testuser1.ndjson', 'testuser2.ndjson'])
+            with open(os.path.join(output_dir, 'testuser1.ndjson')) as export:
+                self.assertEqual(len(export.readlines()), 9)
+
+
+class TestLedgerImport(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        self.model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        self.other_budget = mommy.make(models.MoneyBudgetModel, owner=User.objects.get(username='testuser2'))
+
+    def csv_file(self, *rows):
+        lines = ['kind,parent_id,name,amount'] + [','.join(map(str, row)) for row in rows]
+        return '\n'.join(lines) + '\n'
+
+    def test_import_creates_valid_rows_and_reports_invalid_ones(self):
+        content = self.csv_file(
+            ('income', self.model_budget.pk, 'salary', '1000.00'),
+            ('expense', self.model_budget.pk, 'rent', '400.00'),
+            ('expense', self.model_budget.pk, 'x' * 51, '1.00'),
+            ('expense', self.other_budget.pk, 'theirs', '1.00'),
+            ('transfer', self.model_budget.pk, 'unknown', '1.00'),
+            ('income', self.model_budget.pk, 'bonus', 'abc'),
+        )
+        response = self.client.post(reverse('ledger_import'), {'file': SimpleUploadedFile('ledger.csv', content.encode())})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rows'], 6)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['line'] for error in response.data['errors']], [4, 5, 6, 7])
+        self.model_budget.refresh_from_db()
+        self.assertEqual(self.model_budget.income_total, Decimal('1000.00'))
+        self.assertEqual(self.model_budget.expense_total, Decimal('400.00'))
+        self.assertEqual(self.model_budget.entry_count, 2)
+
+    def test_import_stops_at_undecodable_lines(self):
+        content = self.csv_file(('income', self.model_budget.pk, 'salary', '1000.00')).encode() + 'expense,%d,caf\xe9,1.00\n'.encode('latin-1') % self.model_budget.pk
+        response = self.client.post(reverse('ledger_import'), {'file': SimpleUploadedFile('ledger.csv', content)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['failed'], 1)
+        self.assertIn('could not be read', response.data['errors'][0]['error'])
+
+    def test_import_stops_at_malformed_csv(self):
+        content = self.csv_file(('income', self.model_budget.pk, 'x' * (csv.field_size_limit() + 1), '1.00')).encode()
+        response = self.client.post(reverse('ledger_import'), {'file': SimpleUploadedFile('ledger.csv', content)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([error['line'] for error in response.data['errors']], [2])
+        self.assertIn('field larger than field limit', response.data['errors'][0]['error'])
+
+    def test_import_requires_a_file(self):
+        response = self.client.post(reverse('ledger_import'), {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_ledger_command_writes_in_batches(self):
+        rows = [('income', self.model_budget.pk, 'income %d' % i, '1.00') for i in range(25)]
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as ledger_file:
+            ledger_file.write(self.csv_file(*rows))
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                call_command('import_ledger', 'testuser1', ledger_file.name, '--batch-size', '10', stdout=StringIO())
+        finally:
+            os.unlink(ledger_file.name)
+        self.assertEqual(models.ModelIncome.objects.count(), 25)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('INSERT')]), 3)
+
+
+class TestThrottling(BaseViewTest):
+    def test_signin_is_refused_per_address_before_hashing(self):
+        client = APIClient()
+        credentials = {'username': 'testuser1', 'password': 'wrongpass'}
+        for _ in range(views.UserSignIn.throttle_burst):
+            self.assertEqual(client.post(reverse('signin'), credentials).status_code, status.HTTP_401_UNAUTHORIZED)
+        with self.assertNumQueries(0), mock.patch('ManagerApp.hashers.check_password') as check_password:
+            response = client.post(reverse('signin'), credentials)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertFalse(check_password.called)
+        other_address = APIClient(REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other_address.post(reverse('signin'), credentials).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(THROTTLE_RATE='1/min', THROTTLE_BURST=3)
+    def test_buckets_are_per_credential_and_view(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse('time_budget_model')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('time_budget_model')).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client2.get(reverse('time_budget_model')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('money_budget_model')).status_code, status.HTTP_200_OK)
+
+    @override_settings(THROTTLE_RATE='1/min', THROTTLE_BURST=2)
+    def test_unknown_tokens_are_refused_without_a_lookup(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token not-a-token')
+        for _ in range(2):
+            self.assertEqual(client.get(reverse('time_budget_model')).status_code, status.HTTP_403_FORBIDDEN)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get(reverse('time_budget_model')).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(THROTTLE_RATE='1/min', THROTTLE_BURST=3)
+    def test_rotating_bogus_tokens_share_the_address_bucket(self):
+        # Authenticated once, so the token is in the authentication cache.
+        self.assertEqual(self.client.get(reverse('time_budget_model')).status_code, status.HTTP_200_OK)
+        client = APIClient()
+        statuses = []
+        for attempt in range(5):
+            client.credentials(HTTP_AUTHORIZATION='Token bogus-%d' % attempt)
+            statuses.append(client.get(reverse('time_budget_model')).status_code)
+        self.assertEqual(statuses, [status.HTTP_403_FORBIDDEN] * 2 + [status.HTTP_429_TOO_MANY_REQUESTS] * 3)
+        # A known token from the same address keeps its own bucket.
+        self.assertEqual(self.client.get(reverse('time_budget_model')).status_code, status.HTTP_200_OK)
+
+    @override_settings(THROTTLE_RATE='1/s', THROTTLE_BURST=1)
+    def test_buckets_refill_at_the_rate(self):
+        with mock.patch('ManagerApp.throttling.time.time', return_value=1000.0) as clock:
+            self.assertEqual(self.client.get(reverse('time_budget_model')).status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get(reverse('time_budget_model')).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            clock.return_value = 1001.0
+            self.assertEqual(self.client.get(reverse('time_budget_model')).status_code, status.HTTP_200_OK)
+
+    @override_settings(THROTTLE_ENABLED=False, THROTTLE_BURST=1)
+    def test_throttling_can_be_turned_off(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse('time_budget_model')).status_code, status.HTTP_200_OK)
+
+
+class TestCachedTokenAuthentication(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        self.time_budget = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+
+    def test_warm_requests_skip_the_token_lookup(self):
+        with self.assertNumQueries(2):
+            self.client.get(reverse('time_budget_model_details', kwargs={'pk': self.time_budget.pk}))
+        with self.assertNumQueries(1):
+            self.client.get(reverse('time_budget_model_details', kwargs={'pk': self.time_budget.pk}))
+
+    def test_password_hashes_are_not_cached(self):
+        self.client.get(reverse('time_budget_model'))
+        entry = cache.get(authentication.token_cache_key(self.token.key))
+        self.assertNotIn(self.testing_user.password, repr(entry))
+        user, token = authentication.credentials_from_cache(entry)
+        self.assertEqual((user.pk, user.username, token.key), (self.testing_user.pk, 'testuser1', self.token.key))
+        user.is_staff = True
+        user.save()
+        self.testing_user.refresh_from_db()
+        self.assertTrue(self.testing_user.is_staff)
+        self.assertTrue(check_password('testpass', self.testing_user.password))
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(reverse('time_budget_model'))
+        self.token.delete()
+        response = self.client.get(reverse('time_budget_model'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(reverse('time_budget_model'))
+        self.testing_user.is_active = False
+        self.testing_user.save()
+        response = self.client.get(reverse('time_budget_model'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class TestTokenLifecycle(BaseViewTest):
+    def expire(self, token):
+        Token.objects.filter(pk=token.pk).update(created=timezone.now() - timedelta(days=30))
+
+    def test_signin_returns_the_live_token_with_its_expiry(self):
+        response = self.client.post(reverse('signin'), {'username': 'testuser1', 'password': 'testpass'})
+        self.assertEqual(response.data['token'], self.token.key)
+        self.assertIn('expires', response.data)
+
+    def test_signin_rotates_an_expired_token(self):
+        self.expire(self.token)
+        response = self.client.post(reverse('signin'), {'username': 'testuser1', 'password': 'testpass'})
+        self.assertNotEqual(response.data['token'], self.token.key)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+
+    def test_signin_requires_username_and_password(self):
+        response = self.client.post(reverse('signin'), {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_token_is_rejected(self):
+        self.expire(self.token)
+        response = self.client.get(reverse('time_budget_model'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(TOKEN_TTL=0)
+    def test_cached_token_is_rejected_once_expired(self):
+        response = self.client.get(reverse('time_budget_model'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_refresh_replaces_the_token(self):
+        response = self.client.post(reverse('token_refresh'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('time_budget_model')).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + response.data['token'])
+        self.assertEqual(self.client.get(reverse('time_budget_model')).status_code, status.HTTP_200_OK)
+
+    def test_revoke_deletes_the_token(self):
+        self.client.get(reverse('time_budget_model'))
+        response = self.client.post(reverse('token_revoke'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(reverse('time_budget_model')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_purge_expired_tokens_in_batches(self):
+        self.expire(self.token)
+        self.expire(self.token2)
+        call_command('purge_expired_tokens', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(Token.objects.count(), 0)
+
+
+class TestIdempotencyKeys(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        self.model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        self.income = {'model_income_name': 'salary', 'model_budget': self.model_budget.pk, 'amount': '10.00'}
+
+    def create_income(self, key, client=None, data=None):
+        return (client or self.client).post(reverse('model_income_list_create'), data or self.income, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retries_replay_the_first_response(self):
+        first = self.create_income('key-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.create_income('key-1')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+        self.assertFalse([query for query in queries if 'modelincome' in query['sql'].lower() or 'moneybudgetmodel' in query['sql'].lower()])
+        self.assertEqual(models.ModelIncome.objects.count(), 1)
+        self.model_budget.refresh_from_db()
+        self.assertEqual(self.model_budget.income_total, Decimal('10.00'))
+
+    def test_a_key_cannot_be_reused_for_a_different_request(self):
+        self.create_income('key-1')
+        response = self.create_income('key-1', data=dict(self.income, amount='20.00'))
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        response = self.client.post(reverse('money_budget_model'), {'money_budget_name': 'rent'}, format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(models.ModelIncome.objects.count(), 1)
+
+    def test_keys_are_per_user(self):
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=User.objects.get(username='testuser2'))
+        self.create_income('key-1')
+        response = self.create_income('key-1', client=self.client2, data=dict(self.income, model_budget=model_budget.pk))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_failed_creates_release_the_key(self):
+        self.assertEqual(self.create_income('key-1', data={'amount': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(models.IdempotencyKey.objects.exists())
+        self.assertEqual(self.create_income('key-1').status_code, status.HTTP_201_CREATED)
+
+    def test_expired_keys_are_reusable_and_purged(self):
+        self.create_income('key-1')
+        self.create_income('key-2')
+        models.IdempotencyKey.objects.filter(key='key-1').update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.create_income('key-1')
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(models.ModelIncome.objects.count(), 3)
+
+        models.IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        mommy.make(models.IdempotencyKey, owner=self.testing_user, key='live', expires_at=timezone.now() + timedelta(hours=1))
+        call_command('purge_idempotency_keys', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(list(models.IdempotencyKey.objects.values_list('key', flat=True)), ['live'])
+
+
+class TestConditionalRequests(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        self.time_budget = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+        self.detail_url = reverse('time_budget_model_details', kwargs={'pk': self.time_budget.pk})
+
+    def test_detail_sends_validators_and_answers_304(self):
+        response = self.client.get(self.detail_url)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        cached = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_etag_changes_after_update(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.patch(self.detail_url, {'time_budget_name': 'renamed'})
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_stale_if_match_is_rejected(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        response = self.client.patch(self.detail_url, {'time_budget_name': 'first'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(self.detail_url, {'time_budget_name': 'second'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        response = self.client.delete(self.detail_url, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.time_budget.refresh_from_db()
+        self.assertEqual(self.time_budget.time_budget_name, 'first')
+
+    def test_list_answers_304_until_a_row_is_deleted(self):
+        mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+        etag = self.client.get(reverse('time_budget_model'))['ETag']
+        response = self.client.get(reverse('time_budget_model'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.client.delete(self.detail_url)
+        response = self.client.get(reverse('time_budget_model'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(LIST_CACHE_TIMEOUT=0)
+    def test_list_304_runs_no_query(self):
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        mommy.make(models.ModelIncome, owner=self.testing_user, model_budget=model_budget, _quantity=30)
+        url = reverse('model_income_list_create')
+        etag = self.client.get(url, {'page_size': 10})['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'page_size': 10}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_etag_changes_when_a_command_repairs_totals(self):
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        etag = self.client.get(reverse('money_budget_model'))['ETag']
+        mommy.make(models.ModelIncome, owner=self.testing_user, model_budget=model_budget, amount=Decimal('10.00'))
+        call_command('recompute_budget_totals', stdout=StringIO())
+        response = self.client.get(reverse('money_budget_model'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['income_total'], '10.00')
+
+    def test_money_budget_etag_changes_when_an_income_is_renamed(self):
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        income = mommy.make(models.ModelIncome, owner=self.testing_user, model_budget=model_budget)
+        url = reverse('money_budget_details', kwargs={'pk': model_budget.pk})
+        etag = self.client.get(url)['ETag']
+        self.client.patch(reverse('model_income_details', kwargs={'pk': income.pk}), {'model_income_name': 'renamed'})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+
+class TestListCache(BaseViewTest):
+    def test_repeated_list_is_served_from_cache(self):
+        mommy.make(models.TimeBudgetModel, owner=self.testing_user, _quantity=3)
+        first = self.client.get(reverse('time_budget_model'))
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('time_budget_model'))
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_cache_is_keyed_by_query_params(self):
+        mommy.make(models.TimeBudgetModel, owner=self.testing_user, _quantity=3)
+        self.client.get(reverse('time_budget_model'))
+        response = self.client.get(reverse('time_budget_model'), {'page_size': 1})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_cache_is_per_user(self):
+        mommy.make(models.TimeBudgetModel, owner=self.testing_user, _quantity=3)
+        self.client.get(reverse('time_budget_model'))
+        response = self.client2.get(reverse('time_budget_model'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'], [])
+
+    def test_writes_invalidate_every_list_of_the_user(self):
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        self.client.get(reverse('money_budget_model'))
+        self.client.post(reverse('model_income_list_create'), {'model_income_name': 'salary', 'model_budget': model_budget.pk, 'amount': '10.00'})
+        response = self.client.get(reverse('money_budget_model'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['model_incomes'], ['salary'])
+
+    def test_detail_writes_invalidate_lists(self):
+        time_budget = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+        self.client.get(reverse('time_budget_model'))
+        self.client.delete(reverse('time_budget_model_details', kwargs={'pk': time_budget.pk}))
+        response = self.client.get(reverse('time_budget_model'))
+        self.assertEqual(response.data['results'], [])
+
+    def test_stats_are_admin_only(self):
+        self.client.get(reverse('time_budget_model'))
+        self.client.get(reverse('time_budget_model'))
+        self.assertEqual(self.client.get(reverse('list_cache_stats')).status_code, status.HTTP_403_FORBIDDEN)
+        self.testing_user.is_staff = True
+        self.testing_user.save()
+        response = self.client.get(reverse('list_cache_stats'))
+        self.assertEqual(response.data['hits'], 1)
+        self.assertEqual(response.data['misses'], 1)
+
+
+
+
+class TestPasswordHashing(BaseViewTest):
+    def test_signup_hashes_with_the_configured_profile(self):
+        self.assertTrue(self.testing_user.password.startswith('scrypt$'))
+        self.assertTrue(check_password('testpass', self.testing_user.password))
+
+    def test_signin_upgrades_outdated_hashes(self):
+        self.testing_user.password = make_password('testpass', hasher='pbkdf2_sha256')
+        self.testing_user.save()
+        response = self.client.post(reverse('signin'), {'username': 'testuser1', 'password': 'testpass'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.testing_user.refresh_from_db()
+        self.assertTrue(self.testing_user.password.startswith('scrypt$'))
+        self.assertTrue(check_password('testpass', self.testing_user.password))
+
+    def test_wrong_password_is_not_upgraded(self):
+        outdated = make_password('testpass', hasher='pbkdf2_sha256')
+        self.testing_user.password = outdated
+        self.testing_user.save()
+        response = self.client.post(reverse('signin'), {'username': 'testuser1', 'password': 'wrongpass'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.testing_user.refresh_from_db()
+        self.assertEqual(self.testing_user.password, outdated)
+
+    def test_inactive_users_hashes_are_not_upgraded(self):
+        outdated = make_password('testpass', hasher='pbkdf2_sha256')
+        User.objects.filter(pk=self.testing_user.pk).update(password=outdated, is_active=False)
+        response = self.client.post(reverse('signin'), {'username': 'testuser1', 'password': 'testpass'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.testing_user.refresh_from_db()
+        self.assertEqual(self.testing_user.password, outdated)
+
+    @override_settings(PASSWORD_HASHING_PROCESSES=1)
+    def test_pool_workers_are_not_forked_from_the_server(self):
+        self.assertNotEqual(hashers.hashing_pool()._mp_context.get_start_method(), 'fork')
+        self.assertTrue(hashers.check_password('testpass', hashers.make_password('testpass'))[0])
+
+    def test_scrypt_parameters_changes_need_an_update(self):
+        hasher = hashers.ScryptPasswordHasher()
+        encoded = hasher.encode('testpass', hasher.salt())
+        self.assertFalse(hasher.must_update(encoded))
+        hasher.work_factor = 2 ** 15
+        self.assertTrue(hasher.must_update(encoded))
+        self.assertTrue(hasher.verify('testpass', encoded))
+
+    @override_settings(PASSWORD_HASHING_PROCESSES=0)
+    def test_hashing_can_run_in_the_request_thread(self):
+        self.assertEqual(hashers.check_password('testpass', hashers.make_password('testpass'))[0], True)
+
+    @override_settings(PASSWORD_HASHING_PROCESSES=1)
+    def test_a_broken_pool_is_replaced(self):
+        pool = hashers.hashing_pool()
+        pool.submit(os.getpid).result()
+        for process in list(pool._processes.values()):
+            process.kill()
+            process.join()
+        with self.assertLogs('ManagerApp.hashers', 'WARNING'):
+            self.assertTrue(hashers.check_password('testpass', hashers.make_password('testpass'))[0])
+        self.assertIsNot(hashers.hashing_pool(), pool)
+
+    def test_hashing_falls_back_to_the_calling_thread(self):
+        with mock.patch.object(hashers.ProcessPoolExecutor, 'submit', side_effect=hashers.BrokenProcessPool), \
+                self.assertLogs('ManagerApp.hashers', 'WARNING'):
+            self.assertTrue(hashers.make_password('testpass').startswith('scrypt$'))
+
+
+@override_settings(LIST_CACHE_TIMEOUT=0)
+class TestRequestMetrics(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        instrumentation.histograms.clear()
+
+    def test_server_timing_reports_queries(self):
+        mommy.make(models.TimeBudgetModel, owner=self.testing_user, _quantity=3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('time_budget_model'))
+        self.assertIn('desc="%d queries"' % len(queries), response['Server-Timing'])
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    def test_requests_are_logged_as_json(self):
+        with self.assertLogs('ManagerApp.requests', 'INFO') as logs:
+            response = self.client.get(reverse('time_budget_model'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['url_name'], 'time_budget_model')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['bytes'], len(response.content))
+
+    def test_metrics_are_aggregated_per_url_name(self):
+        for _ in range(3):
+            self.client.get(reverse('time_budget_model'))
+        self.client.get(reverse('money_budget_model'))
+        self.assertEqual(self.client.get(reverse('request_metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        self.testing_user.is_staff = True
+        self.testing_user.save()
+        report = self.client.get(reverse('request_metrics')).data
+        self.assertEqual(report['time_budget_model']['count'], 3)
+        self.assertEqual(report['money_budget_model']['count'], 1)
+        self.assertEqual(set(report['time_budget_model']['wall_ms']), {'p50', 'p95', 'p99'})
+        self.assertIn('queries', report['time_budget_model'])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked against SQLite.')
+class TestQueryPlans(BaseViewTest):
+    """EXPLAIN the owner-scoped view queries and check they are served by an index, not a table scan."""
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        self.assertNotIn('USE TEMP B-TREE', plan)
+
+    def test_list_queries_use_owner_created_indexes(self):
+        for model, index_name in [
+            (models.TimeBudgetModel, 'timebudget_owner_created_idx'),
+            (models.MoneyBudgetModel, 'moneybudget_owner_created_idx'),
+            (models.ModelIncome, 'modelincome_owner_created_idx'),
+            (models.ModelExpense, 'modelexpense_owner_created_idx'),
+            (models.TimeSlotModel, 'timeslot_owner_created_idx'),
+        ]:
+            with self.subTest(model=model.__name__):
+                self.assertUsesIndex(model.objects.filter(owner=self.testing_user).order_by('date_created', 'id'), index_name)
+
+    def test_detail_queries_use_the_primary_key(self):
+        plan = models.ModelIncome.objects.filter(owner=self.testing_user, pk=1).explain()
+        self.assertIn('INTEGER PRIMARY KEY', plan)
+
+    def test_child_queries_use_budget_created_indexes(self):
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.testing_user)
+        model_time_budget = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+        self.assertUsesIndex(models.ModelIncome.objects.filter(model_budget=model_budget), 'income_budget_created_idx')
+        self.assertUsesIndex(models.ModelExpense.objects.filter(model_budget=model_budget), 'expense_budget_created_idx')
+        self.assertUsesIndex(models.TimeSlotModel.objects.filter(model_time_budget=model_time_budget), 'timeslot_budget_created_idx')
+
+    def test_overlap_queries_use_the_start_index(self):
+        model_time_budget = mommy.make(models.TimeBudgetModel, owner=self.testing_user)
+        start = timezone.now()
+        plan = models.TimeSlotModel.objects.filter(model_time_budget=model_time_budget).overlapping(start, start + timedelta(hours=1)).explain()
+        self.assertIn('timeslot_budget_start_idx', plan)
+        self.assertNotIn('SCAN', plan)
+        self.assertNotIn('USE TEMP B-TREE', plan)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite profile only.')
+class TestSQLiteProfile(BaseViewTest):
+    def test_connections_use_relaxed_sync_for_wal(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+@override_settings(ASGI_THREADS=1, LIST_CACHE_TIMEOUT=0)
+class TestBoundedASGIHandler(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='asgiuser')
+        self.token = Token.objects.create(user=self.user)
+        model_budget = mommy.make(models.MoneyBudgetModel, owner=self.user)
+        mommy.make(models.ModelIncome, owner=self.user, model_budget=model_budget, _quantity=3)
+        self.application = BoundedASGIHandler()
+
+    def tearDown(self):
+        asyncio.run(self.application.run_sync(connections.close_all))
+        self.application.executor.shutdown()
+
+    async def request(self, path):
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'authorization', ('Token ' + self.token.key).encode())],
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+            await asyncio.sleep(0)
+
+        await self.application(scope, receive, send)
+        return messages[0]['status'], b''.join(message.get('body', b'') for message in messages[1:])
+
+    def get(self, path):
+        return asyncio.run(self.request(path))
+
+    def test_serves_list_views(self):
+        status_code, body = self.get(reverse('model_income_list_create'))
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(len(json.loads(body.decode())['results']), 3)
+
+    def test_streams_responses_that_query_while_iterating(self):
+        status_code, body = self.get(reverse('ledger_export', kwargs={'export_format': 'ndjson'}))
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(len(body.decode().splitlines()), 4)
+
+    def test_each_streaming_response_stays_on_one_thread(self):
+        model_budget = models.MoneyBudgetModel.objects.get(owner=self.user)
+        mommy.make(models.ModelIncome, owner=self.user, model_budget=model_budget, _quantity=30)
+        with override_settings(ASGI_THREADS=4):
+            self.application.executor.shutdown()
+            self.application = BoundedASGIHandler()
+        self.application.streaming_batch_size = 1
+        threads = []
+        iter_ledger_rows = ledger.iter_ledger_rows
+
+        def recording_rows(user, *args, **kwargs):
+            export_threads = []
+            threads.append(export_threads)
+            for row in iter_ledger_rows(user, *args, **kwargs):
+                export_threads.append(threading.get_ident())
+                yield row
+
+        async def two_exports():
+            path = reverse('ledger_export', kwargs={'export_format': 'ndjson'})
+            return await asyncio.gather(self.request(path), self.request(path))
+
+        with mock.patch('ManagerApp.ledger.iter_ledger_rows', recording_rows):
+            responses = asyncio.run(two_exports())
+        for status_code, body in responses:
+            self.assertEqual(status_code, status.HTTP_200_OK)
+            self.assertEqual(len(body.decode().splitlines()), 34)
+        self.assertEqual(len(threads), 2)
+        for export_threads in threads:
+            self.assertEqual(len(set(export_threads)), 1)
@@ -0,0 +1,141 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from rest_framework import exceptions, status
+from rest_framework.throttling import BaseThrottle
+
+from .authentication import token_cache, token_cache_key
+
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def throttle_cache():
+    return caches[getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default')]
+
+
+def parse_rate(rate):
+    """'20/s', '5/min', '100/hour' etc. as tokens per second."""
+    count, period = rate.split('/')
+    return int(count) / DURATIONS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per client and view, kept in the THROTTLE_CACHE_ALIAS cache
+    so every worker shares it. A bucket holds up to `throttle_burst` tokens
+    and refills at `throttle_rate`; each request takes a token and is
+    refused while the bucket is empty. Views set throttle_rate,
+    throttle_burst and throttle_scope (default: the view's class name);
+    THROTTLE_RATE and THROTTLE_BURST apply otherwise.
+
+    The read and write are not atomic, so concurrent requests of one client
+    can overdraw the bucket by a few tokens; that is fine for shedding load.
+    Subclasses say who the client is in get_ident(), from the request
+    headers only, so ThrottleMiddleware can run the check before the view
+    authenticates anyone.
+    """
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def get_ident(self, request):
+        return 'ip:%s' % super().get_ident(request)
+
+    def allow_request(self, request, view):
+        if not getattr(settings, 'THROTTLE_ENABLED', True) or getattr(request, 'throttles_checked', False):
+            return True
+        rate = parse_rate(getattr(view, 'throttle_rate', None) or getattr(settings, 'THROTTLE_RATE', '10/s'))
+        burst = getattr(view, 'throttle_burst', None) or getattr(settings, 'THROTTLE_BURST', 60)
+        key = self.cache_format % {
+            'scope': getattr(view, 'throttle_scope', None) or type(view).__name__,
+            'ident': self.get_ident(request),
+        }
+        cache = throttle_cache()
+        now = time.time()
+        tokens, updated = cache.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self.wait_seconds = (1 - tokens) / rate
+            return False
+        # A bucket untouched for burst / rate seconds is full again, same as no entry.
+        cache.set(key, (tokens - 1, now), math.ceil(burst / rate) + 1)
+        return True
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class AddressTokenBucket(TokenBucketThrottle):
+    """One bucket per client IP address (REMOTE_ADDR, or X-Forwarded-For behind NUM_PROXIES)."""
+
+
+class UserTokenBucket(TokenBucketThrottle):
+    """
+    One bucket per credential: the token from the Authorization header or
+    the session cookie, hashed, falling back to the client IP address.
+
+    A credential is only trusted to have a bucket of its own once it is known
+    to be valid, i.e. its token is in the authentication cache. Any other
+    credential is also charged to its IP address's bucket, so a client
+    sending a fresh bogus token with every request is still throttled. The
+    price is that a valid token missing from that cache shares the address's
+    bucket for the one request that puts it there.
+    """
+    def allow_request(self, request, view):
+        if not super().allow_request(request, view):
+            return False
+        if self.get_ident(request).startswith('ip:') or self.credential_known(request):
+            return True
+        address = AddressTokenBucket()
+        if address.allow_request(request, view):
+            return True
+        self.wait_seconds = address.wait()
+        return False
+
+    @staticmethod
+    def credential_known(request):
+        keyword, _, key = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        return keyword == 'Token' and bool(key) and token_cache_key(key) in token_cache()
+
+    def get_ident(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        if authorization:
+            return 'auth:%s' % hashlib.sha256(authorization.encode()).hexdigest()
+        session = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if session:
+            return 'session:%s' % hashlib.sha256(session.encode()).hexdigest()
+        return super().get_ident(request)
+
+
+class ThrottleMiddleware:
+    """
+    Runs the throttles of the DRF view a request resolved to before the view
+    is called, so a client over its rate gets a 429 without costing a token
+    lookup, a password hash or a query. The throttles then let the same
+    request through when DRF checks them again.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # DRF's as_view() leaves the view class on the view function.
+        view_class = getattr(view_func, 'cls', None)
+        if view_class is None or not hasattr(view_class, 'get_throttles'):
+            return None
+        view = view_class(**getattr(view_func, 'initkwargs', {}))
+        view.args, view.kwargs = view_args, view_kwargs
+        refused = [throttle for throttle in view.get_throttles() if not throttle.allow_request(request, view)]
+        request.throttles_checked = True
+        if not refused:
+            return None
+        exc = exceptions.Throttled(max((throttle.wait() for throttle in refused if throttle.wait() is not None), default=None))
+        response = JsonResponse({'detail': exc.detail}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        if exc.wait is not None:
+            response['Retry-After'] = '%d' % exc.wait
+        return response
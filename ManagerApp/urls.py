@@ -6,24 +6,44 @@ urlpatterns = [
     path('api-auth/', include('rest_framework.urls')),
     path('signup/', views.SignUp.as_view(), name='signup'),
     path('signin/', views.UserSignIn.as_view(), name='signin'),
+    path('token/refresh/', views.TokenRefresh.as_view(), name='token_refresh'), #this url swaps the current token for a new one
+    path('token/revoke/', views.TokenRevoke.as_view(), name='token_revoke'), #this url deletes the current token
 
     #Time budget operations
     path('time-budget/', views.TimeBudgetModelListCreateView.as_view(), name='time_budget_model'), #this url covers for creating and viewing all time budgets
     path('time-budget/<int:pk>/', views.TimeBudgetModelDetails.as_view(), name='time_budget_model_details'), #this url covers for edit, delete and view single time budget
+    path('time-budget/<int:pk>/availability/', views.TimeBudgetAvailability.as_view(), name='time_budget_availability'), #this url covers for busy slots and free intervals of a time budget between two times
+    path('time-budget/<int:pk>/snapshot/', views.TimeBudgetSnapshot.as_view(), name='time_budget_snapshot'), #this url returns a time budget with its time slots nested
+    path('free-busy/', views.FreeBusy.as_view(), name='free_busy'), #this url covers for merged busy and free intervals across the user's time budgets
+    path('free-windows/', views.FreeWindows.as_view(), name='free_windows'), #this url finds free windows of a given length across the user's time budgets
 
     #Money budget operations
     path('money-budget/', views.MoneyBudgetModelListCreateView.as_view(), name='money_budget_model'), #this url covers for creating and viewing all money budgets
     path('money-budget/<int:pk>/', views.MoneyBudgetModelDetails.as_view(), name='money_budget_details'), #this url covers for edit, delete and view single money budget
+    path('money-budget/<int:pk>/summary/', views.MoneyBudgetModelSummary.as_view(), name='money_budget_summary'), #this url covers for income/expense totals of a single money budget
+    path('money-budget/<int:pk>/snapshot/', views.MoneyBudgetSnapshot.as_view(), name='money_budget_snapshot'), #this url returns a money budget with its incomes and expenses nested
+    path('money-budget/report/', views.MoneyBudgetReport.as_view(), name='money_budget_report'), #this url covers for per day/week/month income and expense totals of every money budget
 
     #Model income operations
     path('model-income/', views.ModelIncomeListCreateView.as_view(), name='model_income_list_create'), #this url covers for creating and viewing all model incomes
+    path('model-income/bulk/', views.ModelIncomeBulk.as_view(), name='model_income_bulk'), #this url covers for creating, updating and deleting model incomes in batches
     path('model-income/<int:pk>/', views.ModelIncomeDetails.as_view(), name='model_income_details'), #this url covers for delete, update and single view of all model incomes
 
     #Model expense operations
     path('model-expense/', views.ModelExpenseListCreateView.as_view(), name='model_expense_list_create'), #this url covers for creating and viewing all model expenses
+    path('model-expense/bulk/', views.ModelExpenseBulk.as_view(), name='model_expense_bulk'), #this url covers for creating, updating and deleting model expenses in batches
     path('model-expense/<int:pk>/', views.ModelExpenseDetails.as_view(), name='model_expense_details'), #this url covers for delete, update and single view of all model expenses
 
     #time slot model urls
     path('time-slot-model/', views.TimeSlotModelListCreate.as_view(), name='time_slot_model_list_create'),
-    path('time-slot-model/<int:pk>/', views.TimeSlotModelDetails.as_view(), name='time_slot_model_details')
+    path('time-slot-model/bulk/', views.TimeSlotModelBulk.as_view(), name='time_slot_model_bulk'),
+    path('time-slot-model/<int:pk>/', views.TimeSlotModelDetails.as_view(), name='time_slot_model_details'),
+
+    #Ledger export and import
+    path('ledger-export/<str:export_format>/', views.LedgerExport.as_view(), name='ledger_export'), #this url streams all of the user's budgets, incomes, expenses and time slots as csv or ndjson
+    path('ledger-import/', views.LedgerImport.as_view(), name='ledger_import'), #this url bulk imports incomes and expenses from an uploaded csv file
+
+    #Cache statistics
+    path('list-cache-stats/', views.ListCacheStats.as_view(), name='list_cache_stats'), #this url reports list cache hits and misses to admin users
+    path('request-metrics/', views.RequestMetrics.as_view(), name='request_metrics'), #this url reports per-url latency, query and size percentiles to admin users
 ]
\ No newline at end of file
@@ -1,18 +1,174 @@
+import io
+from datetime import datetime, timedelta
+
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Prefetch, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import permissions, generics, response, status, authtoken, views
-from . import serializers, models, permisions
+from rest_framework.exceptions import ValidationError
+from . import authentication, instrumentation, ledger, response_cache, scheduling, serializers, models, permisions, throttling
+from .conditional import ConditionalDetailMixin, ConditionalListMixin
+from .filters import DateCreatedRangeFilter, filter_date_created, is_id, parse_bound
+from .idempotency import IdempotentCreateMixin
+from .response_cache import CachedListMixin, InvalidateListCacheMixin
+
+
+# The budget serializers render the owner's username and the names of the
+# related incomes/expenses, so load them up front instead of once per row.
+money_budget_queryset = models.MoneyBudgetModel.objects.select_related('owner').prefetch_related(
+    Prefetch('model_incomes', queryset=models.ModelIncome.objects.only('id', 'model_budget', 'model_income_name')),
+    Prefetch('model_expenses', queryset=models.ModelExpense.objects.only('id', 'model_budget', 'model_expense_name')),
+)
+
+
+class BudgetTotalsMixin:
+    """
+    Keeps MoneyBudgetModel's materialised totals in step with incomes/expenses
+    written through the view, in the same transaction as the write itself.
+    """
+    total_field = None
+
+    def budget_changes(self, instances, sign=1):
+        if self.total_field is None:
+            return []
+        return [(instance.model_budget_id, sign * instance.amount, sign) for instance in instances]
+
+    def adjust_budgets(self, changes):
+        if changes:
+            models.MoneyBudgetModel.objects.apply_changes(self.total_field, changes)
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            instance = serializer.save(owner=self.request.user)
+            self.adjust_budgets(self.budget_changes([instance]))
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            previous = type(serializer.instance).objects.select_for_update().get(pk=serializer.instance.pk)
+            instance = serializer.save()
+            self.adjust_budgets(self.budget_changes([previous], -1) + self.budget_changes([instance]))
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            self.adjust_budgets(self.budget_changes([instance], -1))
+
+
+class LeanListMixin:
+    """
+    Renders GET lists from values() rows through lean_serializer_class,
+    skipping model instances and ModelSerializer fields; writes keep using
+    serializer_class.
+    """
+    lean_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        # The cursor paginator orders by date_created and id.
+        columns = dict.fromkeys(['id', 'date_created', *self.lean_serializer_class.columns()])
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return response.Response(self.lean_serializer_class(queryset, many=True).data)
+        return self.get_paginated_response(self.lean_serializer_class(page, many=True).data)
+
+
+class BulkCreateModelMixin:
+    """Creates a batch of rows in one transaction; the bulk counterpart of DRF's CreateModelMixin."""
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=self.get_batch(request), many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            instances = serializer.save(owner=request.user)
+            self.adjust_budgets(self.budget_changes(instances))
+        return response.Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class BulkCreateUpdateDestroyView(BudgetTotalsMixin, InvalidateListCacheMixin, IdempotentCreateMixin, BulkCreateModelMixin, generics.GenericAPIView):
+    """
+    POST a JSON array of rows to create them, PATCH an array of rows carrying
+    their "id" to update them, or DELETE an array of ids. Each batch runs in
+    one transaction with bulk_create/bulk_update. POSTs take an
+    Idempotency-Key like the single-row create views.
+    """
+    permission_classes = (permissions.IsAuthenticated, )
+    max_batch_size = 1000
+
+    def get_queryset(self):
+        queryset = self.queryset.filter(owner=self.request.user)
+        return queryset
+
+    def get_batch(self, request):
+        if not isinstance(request.data, list) or not request.data:
+            raise ValidationError('Expected a non-empty list.')
+        if len(request.data) > self.max_batch_size:
+            raise ValidationError('A batch may hold at most %d items.' % self.max_batch_size)
+        return request.data
+
+    def get_batch_ids(self, items):
+        if not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in items):
+            raise ValidationError('Every item must have an integer id.')
+        if len(set(items)) != len(items):
+            raise ValidationError('Ids must be unique within a batch.')
+        return items
+
+    def post(self, request, format=None):
+        return self.create(request)
+
+    def patch(self, request, format=None):
+        rows = self.get_batch(request)
+        ids = self.get_batch_ids([row.get('id') if isinstance(row, dict) else None for row in rows])
+        with transaction.atomic():
+            instances = self.get_queryset().select_for_update().in_bulk(ids)
+            missing = [pk for pk in ids if pk not in instances]
+            if missing:
+                raise ValidationError({'id': ['Not found: %s' % ', '.join(map(str, missing))]})
+            instances = [instances[pk] for pk in ids]
+            previous = self.budget_changes(instances, -1)
+            serializer = self.get_serializer(instances, data=rows, many=True, partial=True)
+            serializer.is_valid(raise_exception=True)
+            self.adjust_budgets(previous + self.budget_changes(serializer.save()))
+        return response.Response(serializer.data)
+
+    def delete(self, request, format=None):
+        ids = self.get_batch_ids(self.get_batch(request))
+        with transaction.atomic():
+            queryset = self.get_queryset().filter(pk__in=ids)
+            changes = []
+            if self.total_field is not None:
+                changes = [(row['model_budget'], -row['amount'], -row['entries']) for row in
+                           queryset.order_by().values('model_budget').annotate(amount=Sum('amount', output_field=models.total_output_field()), entries=Count('id'))]
+            queryset.delete()
+            self.adjust_budgets(changes)
+        return response.Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def token_data(token):
+    return {'token': token.key, 'expires': authentication.token_expires_at(token)}
 
 
 class SignUp(generics.CreateAPIView):
+    authentication_classes = ()
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (throttling.AddressTokenBucket,)
+    throttle_rate = '10/hour'
+    throttle_burst = 10
     serializer_class = serializers.UserSerializer
     queryset = User.objects.all()
 
 
 class UserSignIn(views.APIView):
+    # No authentication, so a client holding an expired token can still sign in.
+    # Throttled per IP address before any password is hashed.
+    authentication_classes = ()
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (throttling.AddressTokenBucket,)
+    throttle_rate = '10/min'
+    throttle_burst = 10
     def post(self, request, format=None):
         username = request.data.get('username')
         password = request.data.get('password')
@@ -22,17 +178,31 @@ class UserSignIn(views.APIView):
                 return response.Response({'error': 'Invalid Credentials'},
                         status=status.HTTP_401_UNAUTHORIZED)
             else:
-                token, _ = authtoken.models.Token.objects.get_or_create(user=user)
-                return response.Response({'token': token.key},
+                token = authentication.issue_token(user)
+                return response.Response(token_data(token),
                 status=status.HTTP_200_OK)
-        return response.Response({'token': token.key},
+        return response.Response({'error': 'Please provide username and password'},
                 status=status.HTTP_400_BAD_REQUEST)
 
 
-class TimeBudgetModelListCreateView(generics.ListCreateAPIView):
+class TokenRefresh(views.APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    def post(self, request, format=None):
+        token = authentication.rotate_token(request.user)
+        return response.Response(token_data(token), status=status.HTTP_200_OK)
+
+
+class TokenRevoke(views.APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    def post(self, request, format=None):
+        authtoken.models.Token.objects.filter(user=request.user).delete()
+        return response.Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class TimeBudgetModelListCreateView(CachedListMixin, ConditionalListMixin, IdempotentCreateMixin, generics.ListCreateAPIView):
     permission_classes = (permissions.IsAuthenticated, )
     serializer_class = serializers.TimeBudgetModelSerializer
-    queryset = models.TimeBudgetModel.objects.all()
+    queryset = models.TimeBudgetModel.objects.select_related('owner')
 
     def get_queryset(self):
         queryset = self.queryset.filter(owner=self.request.user)
@@ -42,20 +212,117 @@ class TimeBudgetModelListCreateView(generics.ListCreateAPIView):
         serializer.save(owner=self.request.user)
 
 
-class TimeBudgetModelDetails(generics.RetrieveUpdateDestroyAPIView):
+class TimeBudgetModelDetails(InvalidateListCacheMixin, ConditionalDetailMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = (permissions.IsAuthenticated, )
     serializer_class = serializers.TimeBudgetModelSerializer
-    queryset = models.TimeBudgetModel.objects.all()
+    queryset = models.TimeBudgetModel.objects.select_related('owner')
 
     def get_queryset(self):
         queryset = self.queryset.filter(owner=self.request.user)
         return queryset
 
 
-class MoneyBudgetModelListCreateView(generics.ListCreateAPIView):
+class ScheduleWindowMixin:
+    """Reads the ?start=/?end= window (at most max_window apart) of the scheduling views."""
+    max_window = timedelta(days=366)
+
+    def get_window(self, request):
+        for param in ('start', 'end'):
+            if not request.query_params.get(param):
+                raise ValidationError({param: ['This query parameter is required.']})
+        start = parse_bound(request.query_params['start'], 'start')
+        end = parse_bound(request.query_params['end'], 'end')
+        if not start < end or end - start > self.max_window:
+            raise ValidationError({'end': ['End must be after start and at most %d days later.' % self.max_window.days]})
+        return start, end
+
+    def get_time_budget_ids(self, request):
+        """The user's time budgets named in ?time_budgets=1,2 (all of them when absent)."""
+        queryset = models.TimeBudgetModel.objects.filter(owner=request.user)
+        requested = request.query_params.get('time_budgets')
+        if not requested:
+            return list(queryset.values_list('id', flat=True))
+        pks = set(requested.split(','))
+        if not all(is_id(pk) for pk in pks):
+            raise ValidationError({'time_budgets': ['Enter a comma separated list of time budget ids.']})
+        ids = list(queryset.filter(pk__in=pks).values_list('id', flat=True))
+        if len(ids) != len(pks):
+            raise Http404
+        return ids
+
+
+class TimeBudgetAvailability(ScheduleWindowMixin, generics.GenericAPIView):
+    """
+    The scheduled slots of a time budget overlapping ?start= to ?end= and the
+    free intervals between them.
+    """
+    permission_classes = (permissions.IsAuthenticated, )
+    serializer_class = serializers.TimeSlotModelSerializer
+    queryset = models.TimeSlotModel.objects.all()
+
+    def get(self, request, pk, format=None):
+        start, end = self.get_window(request)
+        time_budget = get_object_or_404(models.TimeBudgetModel.objects.filter(owner=request.user).only('id'), pk=pk)
+        slots = list(self.get_queryset().filter(model_time_budget=time_budget).overlapping(start, end))
+        return response.Response({
+            'start': start,
+            'end': end,
+            'busy': self.get_serializer(slots, many=True).data,
+            'free': [{'start': free_start, 'end': free_end} for free_start, free_end in
+                     scheduling.free_intervals([(slot.start_time, slot.end_time) for slot in slots], start, end)],
+        })
+
+
+class FreeBusy(ScheduleWindowMixin, views.APIView):
+    """
+    Busy and free intervals between ?start= and ?end= across the user's time
+    budgets (or those in ?time_budgets=), from the cached busy lists.
+    """
+    permission_classes = (permissions.IsAuthenticated, )
+
+    def get(self, request, format=None):
+        start, end = self.get_window(request)
+        busy = scheduling.busy_between(self.get_time_budget_ids(request), start, end)
+        return response.Response({
+            'start': start,
+            'end': end,
+            'busy': [{'start': busy_start, 'end': busy_end} for busy_start, busy_end in busy],
+            'free': [{'start': free_start, 'end': free_end} for free_start, free_end in scheduling.free_intervals(busy, start, end)],
+        })
+
+
+class FreeWindows(ScheduleWindowMixin, views.APIView):
+    """
+    The first ?count= (default 5, at most max_count) free windows of
+    ?duration= minutes (at most the length of the window) between ?start=
+    and ?end= across the user's time budgets (or those in ?time_budgets=).
+    """
+    permission_classes = (permissions.IsAuthenticated, )
+    max_count = 100
+
+    def get_positive_int(self, request, param, maximum, default=None):
+        value = str(request.query_params.get(param, default))
+        # Length first: int() refuses strings of thousands of digits with ValueError.
+        if not (value.isascii() and value.isdigit()) or len(value) > len(str(maximum)) or not 0 < int(value) <= maximum:
+            raise ValidationError({param: ['Enter a whole number from 1 to %d.' % maximum]})
+        return int(value)
+
+    def get(self, request, format=None):
+        start, end = self.get_window(request)
+        duration = timedelta(minutes=self.get_positive_int(request, 'duration', (end - start) // timedelta(minutes=1)))
+        count = self.get_positive_int(request, 'count', self.max_count, 5)
+        busy = scheduling.busy_between(self.get_time_budget_ids(request), start, end)
+        return response.Response({
+            'duration': int(duration.total_seconds() // 60),
+            'windows': [{'start': window_start, 'end': window_end} for window_start, window_end in
+                        scheduling.free_windows(busy, start, end, duration, count)],
+        })
+
+
+class MoneyBudgetModelListCreateView(CachedListMixin, ConditionalListMixin, IdempotentCreateMixin, generics.ListCreateAPIView):
     permission_classes = (permissions.IsAuthenticated, )
     serializer_class = serializers.MoneyBudgetModelSerializer
-    queryset = models.MoneyBudgetModel.objects.all()
+    queryset = money_budget_queryset
 
     def get_queryset(self):
         queryset = self.queryset.filter(owner=self.request.user)
@@ -65,30 +332,150 @@ class MoneyBudgetModelListCreateView(generics.ListCreateAPIView):
         serializer.save(owner=self.request.user)
 
 
-class MoneyBudgetModelDetails(generics.RetrieveUpdateDestroyAPIView):
+class MoneyBudgetModelDetails(InvalidateListCacheMixin, ConditionalDetailMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = (permissions.IsAuthenticated, )
     serializer_class = serializers.MoneyBudgetModelSerializer
-    queryset = models.MoneyBudgetModel.objects.filter()
+    queryset = money_budget_queryset
 
     def get_queryset(self):
         queryset = self.queryset.filter(owner=self.request.user)
         return queryset
 
 
-class ModelIncomeListCreateView(generics.ListCreateAPIView):
+class BudgetSnapshotView(generics.RetrieveAPIView):
+    """
+    A budget with its children nested, in one round trip: one query for the
+    budget and one Prefetch query per relation. ?fields= takes a comma
+    separated sparse fieldset, e.g. ?fields=money_budget_name,model_incomes.amount;
+    only those columns are selected and relations left out are not queried.
+    """
     permission_classes = (permissions.IsAuthenticated, )
+    # Nested field name -> (child model, its foreign key to the budget).
+    relations = {}
+
+    def get_sparse_fields(self):
+        param = self.request.query_params.get('fields')
+        if not param:
+            return None
+        available = self.get_serializer_class()().fields
+        sparse_fields = {}
+        for item in param.split(','):
+            name, _, nested = item.strip().partition('.')
+            if name not in available or (nested and (name not in self.relations or nested not in available[name].child.fields)):
+                raise ValidationError({'fields': ['Unknown field: %s.' % item.strip()]})
+            if not nested:
+                sparse_fields[name] = None
+            elif sparse_fields.get(name, set()) is not None:
+                sparse_fields.setdefault(name, set()).add(nested)
+        return sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['sparse_fields'] = self.sparse_fields
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        self.sparse_fields = self.get_sparse_fields()
+        fields = self.get_serializer_class()(sparse_fields=self.sparse_fields).fields
+        queryset = self.queryset.filter(owner=self.request.user).only(
+            'id', *[name for name in fields if name not in self.relations])
+        for name, (model, foreign_key) in self.relations.items():
+            if name in fields:
+                columns = {'id', foreign_key} | set(fields[name].child.fields)
+                queryset = queryset.prefetch_related(Prefetch(name, queryset=model.objects.only(*columns).order_by('date_created', 'id')))
+        return queryset
+
+
+class MoneyBudgetSnapshot(BudgetSnapshotView):
+    serializer_class = serializers.MoneyBudgetSnapshotSerializer
+    queryset = models.MoneyBudgetModel.objects.all()
+    relations = {
+        'model_incomes': (models.ModelIncome, 'model_budget'),
+        'model_expenses': (models.ModelExpense, 'model_budget'),
+    }
+
+
+class TimeBudgetSnapshot(BudgetSnapshotView):
+    serializer_class = serializers.TimeBudgetSnapshotSerializer
+    queryset = models.TimeBudgetModel.objects.all()
+    relations = {
+        'time_slot_models': (models.TimeSlotModel, 'model_time_budget'),
+    }
+
+
+class MoneyBudgetModelSummary(generics.GenericAPIView):
+    permission_classes = (permissions.IsAuthenticated, )
+    serializer_class = serializers.MoneyBudgetSummarySerializer
+    queryset = models.MoneyBudgetModel.objects.with_balance()
+
+    def get(self, request, pk, format=None):
+        summary = get_object_or_404(self.get_queryset().values(*self.get_serializer().fields), pk=pk)
+        return response.Response(self.get_serializer(summary).data)
+
+    def get_queryset(self):
+        queryset = self.queryset.filter(owner=self.request.user)
+        return queryset
+
+
+# Date buckets of the money budget report, truncated in SQL in the current time zone.
+REPORT_PERIODS = {'day': TruncDate, 'week': TruncWeek, 'month': TruncMonth}
+
+
+class MoneyBudgetReport(generics.GenericAPIView):
+    """
+    Income and expense totals and counts per money budget and day, week or
+    month (?period=, default month), grouped in SQL. Takes the same
+    ?since=/?until= range as the income and expense lists, and ?money_budget=
+    to report on a single budget.
+    """
+    permission_classes = (permissions.IsAuthenticated, )
+    serializer_class = serializers.MoneyBudgetReportSerializer
+
+    def get(self, request, format=None):
+        period = request.query_params.get('period', 'month')
+        if period not in REPORT_PERIODS:
+            raise ValidationError({'period': ['Choose one of: %s.' % ', '.join(REPORT_PERIODS)]})
+        money_budget = request.query_params.get('money_budget')
+        if money_budget is not None and not is_id(money_budget):
+            raise ValidationError({'money_budget': ['Enter a money budget id.']})
+
+        buckets = {}
+        for model, kind in ((models.ModelIncome, 'income'), (models.ModelExpense, 'expense')):
+            queryset = filter_date_created(request, model.objects.filter(owner=request.user))
+            if money_budget is not None:
+                queryset = queryset.filter(model_budget=money_budget)
+            rows = queryset.annotate(period=REPORT_PERIODS[period]('date_created')).values('model_budget', 'period').annotate(
+                total=Sum('amount', output_field=models.total_output_field()), count=Count('id')).order_by()
+            for row in rows:
+                bucket_start = row['period']
+                if isinstance(bucket_start, datetime):
+                    bucket_start = timezone.localtime(bucket_start).date()
+                bucket = buckets.setdefault((row['model_budget'], bucket_start), {
+                    'money_budget': row['model_budget'], 'period': bucket_start,
+                    'income_total': 0, 'income_count': 0, 'expense_total': 0, 'expense_count': 0,
+                })
+                bucket[kind + '_total'] = row['total']
+                bucket[kind + '_count'] = row['count']
+        report = [buckets[key] for key in sorted(buckets)]
+        return response.Response(self.get_serializer(report, many=True).data)
+
+
+class ModelIncomeListCreateView(BudgetTotalsMixin, CachedListMixin, ConditionalListMixin, LeanListMixin, IdempotentCreateMixin, generics.ListCreateAPIView):
+    total_field = 'income_total'
+    permission_classes = (permissions.IsAuthenticated, )
+    throttle_rate = '5/s'
+    throttle_burst = 30
     serializer_class = serializers.ModelIncomeSerializer
+    lean_serializer_class = serializers.LeanModelIncomeSerializer
+    filter_backends = (DateCreatedRangeFilter, )
     queryset = models.ModelIncome.objects.all()
 
-    def perform_create(self, serializer):
-        serializer.save(owner=self.request.user)
-
     def get_queryset(self):
         queryset = self.queryset.filter(owner=self.request.user)
         return queryset
 
 
-class ModelIncomeDetails(generics.RetrieveUpdateDestroyAPIView):
+class ModelIncomeDetails(BudgetTotalsMixin, InvalidateListCacheMixin, ConditionalDetailMixin, generics.RetrieveUpdateDestroyAPIView):
+    total_field = 'income_total'
     permission_classes = (permissions.IsAuthenticated, )
     serializer_class = serializers.ModelIncomeSerializer
     queryset = models.ModelIncome.objects.all()
@@ -98,20 +485,29 @@ class ModelIncomeDetails(generics.RetrieveUpdateDestroyAPIView):
         return queryset
 
 
-class ModelExpenseListCreateView(generics.ListCreateAPIView):
+class ModelIncomeBulk(BulkCreateUpdateDestroyView):
+    total_field = 'income_total'
+    serializer_class = serializers.ModelIncomeSerializer
+    queryset = models.ModelIncome.objects.all()
+
+
+class ModelExpenseListCreateView(BudgetTotalsMixin, CachedListMixin, ConditionalListMixin, LeanListMixin, IdempotentCreateMixin, generics.ListCreateAPIView):
+    total_field = 'expense_total'
     permission_classes = (permissions.IsAuthenticated, )
+    throttle_rate = '5/s'
+    throttle_burst = 30
     serializer_class = serializers.ModelExpenseSerializer
+    lean_serializer_class = serializers.LeanModelExpenseSerializer
+    filter_backends = (DateCreatedRangeFilter, )
     queryset = models.ModelExpense.objects.all()
 
-    def perform_create(self, serializer):
-        serializer.save(owner=self.request.user)
-
     def get_queryset(self):
         queryset = self.queryset.filter(owner=self.request.user)
         return queryset
 
 
-class ModelExpenseDetails(generics.RetrieveUpdateDestroyAPIView):
+class ModelExpenseDetails(BudgetTotalsMixin, InvalidateListCacheMixin, ConditionalDetailMixin, generics.RetrieveUpdateDestroyAPIView):
+    total_field = 'expense_total'
     permission_classes = (permissions.IsAuthenticated, )
     serializer_class = serializers.ModelExpenseSerializer
     queryset = models.ModelExpense.objects.all()
@@ -121,9 +517,16 @@ class ModelExpenseDetails(generics.RetrieveUpdateDestroyAPIView):
         return queryset
 
 
-class TimeSlotModelListCreate(generics.ListCreateAPIView):
+class ModelExpenseBulk(BulkCreateUpdateDestroyView):
+    total_field = 'expense_total'
+    serializer_class = serializers.ModelExpenseSerializer
+    queryset = models.ModelExpense.objects.all()
+
+
+class TimeSlotModelListCreate(CachedListMixin, ConditionalListMixin, LeanListMixin, IdempotentCreateMixin, generics.ListCreateAPIView):
     permission_classes = (permissions.IsAuthenticated, )
     serializer_class = serializers.TimeSlotModelSerializer
+    lean_serializer_class = serializers.LeanTimeSlotModelSerializer
     queryset = models.TimeSlotModel.objects.all()
 
     def perform_create(self, serializer):
@@ -133,11 +536,54 @@ class TimeSlotModelListCreate(generics.ListCreateAPIView):
         queryset = self.queryset.filter(owner=self.request.user)
         return queryset
 
-class TimeSlotModelDetails(generics.RetrieveUpdateDestroyAPIView):
+class TimeSlotModelDetails(InvalidateListCacheMixin, ConditionalDetailMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = (permissions.IsAuthenticated, )
     serializer_class = serializers.TimeSlotModelSerializer
     queryset = models.TimeSlotModel.objects.all()
 
     def get_queryset(self):
         queryset = self.queryset.filter(owner=self.request.user)
-        return queryset
\ No newline at end of file
+        return queryset
+
+
+class TimeSlotModelBulk(BulkCreateUpdateDestroyView):
+    serializer_class = serializers.TimeSlotModelSerializer
+    queryset = models.TimeSlotModel.objects.all()
+
+
+class LedgerExport(views.APIView):
+    permission_classes = (permissions.IsAuthenticated, )
+
+    def get(self, request, export_format, format=None):
+        if export_format not in ledger.RENDERERS:
+            raise Http404
+        render, content_type = ledger.RENDERERS[export_format]
+        streaming_response = StreamingHttpResponse(render(ledger.iter_ledger_rows(request.user)), content_type=content_type)
+        streaming_response['Content-Disposition'] = 'attachment; filename="ledger.%s"' % export_format
+        return streaming_response
+
+
+class LedgerImport(InvalidateListCacheMixin, views.APIView):
+    permission_classes = (permissions.IsAuthenticated, )
+
+    def post(self, request, format=None):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': ['Upload a CSV file.']})
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+        report = ledger.import_ledger_rows(request.user, lines)
+        return response.Response(report.as_dict(), status=status.HTTP_200_OK)
+
+
+class ListCacheStats(views.APIView):
+    permission_classes = (permissions.IsAdminUser, )
+
+    def get(self, request, format=None):
+        return response.Response(response_cache.stats())
+
+
+class RequestMetrics(views.APIView):
+    permission_classes = (permissions.IsAdminUser, )
+
+    def get(self, request, format=None):
+        return response.Response(instrumentation.histograms.snapshot())